@@ -0,0 +1,61 @@
+"""MessageEvent 构造耗时基准
+
+用法: python benchmarks/bench_event.py
+"""
+
+import timeit
+from copy import deepcopy
+from datetime import datetime
+
+from nonechat.model import DIRECT, User, Channel
+from nonechat.message import Text, Markup, ConsoleMessage
+from nonebot.compat import model_dump, type_validate_python
+from nonechat.model import MessageEvent as ConsoleMessageEvent
+
+from nonebot.adapters.console.message import Message
+from nonebot.adapters.console.event import MessageEvent, PublicMessageEvent, PrivateMessageEvent
+
+
+def make_console_event(size: int) -> ConsoleMessageEvent:
+    elements = [Text("hello world") if i % 2 == 0 else Markup("[b]bold[/b]") for i in range(size)]
+    return ConsoleMessageEvent(
+        time=datetime.now(),
+        self_id="robot",
+        type="console.message",
+        user=User("user"),
+        message_id="message",
+        message=ConsoleMessage(elements),
+        channel=Channel("general", "通用"),
+    )
+
+
+def two_step(event: ConsoleMessageEvent) -> MessageEvent:
+    """优化前的构造方式: 先构造 MessageEvent 再转换, 每次校验都深拷贝 original_message"""
+    base = MessageEvent(
+        time=event.time,
+        self_id=event.self_id,
+        user=event.user,
+        post_type="message",
+        message_id=event.message_id,
+        message=Message.from_console_message(event.message),
+        channel=event.channel,
+    )
+    base.original_message = deepcopy(base.message)
+    if base.channel.id == DIRECT.id or base.channel.id.startswith("private:"):
+        result = type_validate_python(PrivateMessageEvent, model_dump(base))
+    else:
+        result = type_validate_python(PublicMessageEvent, model_dump(base))
+    result.original_message = deepcopy(result.message)
+    return result
+
+
+def main(number: int = 5000) -> None:
+    for size in (1, 10, 100):
+        event = make_console_event(size)
+        for name, func in (("two-step", two_step), ("from_console_event", MessageEvent.from_console_event)):
+            cost = timeit.timeit(lambda: func(event), number=number) / number
+            print(f"segments={size:<4} {name:<20} {cost * 1e6:8.1f} us/event")
+
+
+if __name__ == "__main__":
+    main()
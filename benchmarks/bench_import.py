@@ -0,0 +1,100 @@
+"""Console 适配器导入耗时基准
+
+在独立的子进程中以 `-X importtime` 导入适配器, 统计总耗时以及 Textual / Rich 所占的耗时,
+并检查导入后哪些被跟踪的包出现在 `sys.modules` 中。
+指定 `--max-ms` 时, 中位数超过该值则以非零状态退出; 指定 `--forbid` 时, 导入后加载了对应的包则以非零状态退出,
+可用于 CI 中防止导入耗时回退。
+
+nonechat 的任意模块都会导入 Textual, 适配器只在启动前端时才导入 nonechat。
+
+用法: python benchmarks/bench_import.py --runs 10 --max-ms 1500 --forbid textual --forbid rich
+"""
+
+import sys
+import json
+import argparse
+import subprocess
+from statistics import median
+
+TARGET = "nonebot.adapters.console"
+TRACKED = ("textual", "rich", "nonechat", "nonebot")
+
+
+def import_times(module: str) -> dict[str, float]:
+    """返回目标模块的累计导入耗时, 以及各顶层包自身导入耗时之和 (毫秒)"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times: dict[str, float] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        head, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        name = name.strip()
+        if name == module:
+            times[name] = int(cumulative) / 1000
+        # 包的 __init__ 不一定导入全部子模块, 按自身耗时累加才能统计到所有子模块
+        if (package := name.split(".", 1)[0]) in TRACKED:
+            times[package] = times.get(package, 0.0) + int(head.rsplit(":", 1)[1]) / 1000
+    return times
+
+
+def loaded_packages(module: str) -> list[str]:
+    """导入目标模块后已加载的被跟踪的包"""
+    proc = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import sys, json, {module}; print(json.dumps([name for name in {TRACKED!r} if name in sys.modules]))",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(proc.stdout)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default=TARGET, help="要导入的模块")
+    parser.add_argument("--runs", type=int, default=5, help="重复次数")
+    parser.add_argument("--max-ms", type=float, default=None, help="总导入耗时中位数的上限 (毫秒)")
+    parser.add_argument("--forbid", action="append", default=[], choices=TRACKED, help="导入后不应加载的包")
+    parser.add_argument("--output", default="-", help="结果 JSON 文件, 默认输出到标准输出")
+    args = parser.parse_args()
+
+    runs = [import_times(args.module) for _ in range(args.runs)]
+    report = {
+        "module": args.module,
+        "runs": args.runs,
+        "median_ms": {name: median(run.get(name, 0.0) for run in runs) for name in (args.module, *TRACKED)},
+        "loaded": loaded_packages(args.module),
+    }
+    total = report["median_ms"][args.module]
+    print(f"import {args.module}: {total:.1f}ms (median of {args.runs})", file=sys.stderr)
+    for name in TRACKED:
+        print(f"  {name:<10} {report['median_ms'][name]:8.1f}ms", file=sys.stderr)
+    print(f"loaded after import: {', '.join(report['loaded']) or '-'}", file=sys.stderr)
+
+    if args.output == "-":
+        print(json.dumps(report, indent=2))
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.max_ms is not None and total > args.max_ms:
+        print(f"import time {total:.1f}ms exceeds limit {args.max_ms:.1f}ms", file=sys.stderr)
+        return 1
+    if forbidden := [name for name in args.forbid if name in report["loaded"]]:
+        print(f"import loaded forbidden packages: {', '.join(forbidden)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
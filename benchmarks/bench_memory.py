@@ -0,0 +1,76 @@
+"""消息表示的内存占用基准
+
+统计在内存聊天记录中保留大量消息, 以及直接保留 Message 对象时每条消息占用的内存。
+转换缓存被关闭, 以便只统计消息本身的表示。
+
+用法: python benchmarks/bench_memory.py --count 50000
+"""
+
+import gc
+import argparse
+import tracemalloc
+from typing import Callable
+from datetime import datetime
+
+from nonechat.model import Robot, Channel
+from nonechat.model import MessageEvent as ConsoleMessageEvent
+
+from nonebot.adapters.console.store import MemoryMessageStore
+from nonebot.adapters.console.message import Message, MessageSegment
+
+BOT = Robot("robot")
+CHANNEL = Channel("general", "general")
+
+SHAPES: dict[str, Callable[[int], Message]] = {
+    "text": lambda i: Message(f"line {i}"),
+    "text x3": lambda i: Message(f"line {i}") + " and " + str(i),
+    "mixed": lambda i: Message(f"line {i}") + MessageSegment.emoji("smile") + MessageSegment.markup(f"[b]{i}[/b]"),
+}
+
+
+def measure(build: Callable[[], object]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    retained = build()
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del retained
+    return after - before
+
+
+def retain_history(shape: Callable[[int], Message], count: int) -> MemoryMessageStore:
+    store = MemoryMessageStore(retention=count)
+    now = datetime.now()
+    for i in range(count):
+        store.put(
+            CHANNEL.id,
+            ConsoleMessageEvent(
+                time=now,
+                self_id=BOT.id,
+                type="console.message",
+                user=BOT,
+                message_id=f"{i:016x}",
+                message=shape(i).to_console_message(),
+                channel=CHANNEL,
+            ),
+        )
+    return store
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=50000, help="保留的消息数量")
+    args = parser.parse_args()
+    Message.to_console_cache.maxsize = 0
+    Message.from_console_cache.maxsize = 0
+
+    for name, shape in SHAPES.items():
+        history = measure(lambda: retain_history(shape, args.count)) / args.count
+        messages = measure(lambda: [shape(i) for i in range(args.count)]) / args.count
+        print(f"{name:<8} history {history:8.1f} B/msg  Message {messages:8.1f} B/msg")
+
+
+if __name__ == "__main__":
+    main()
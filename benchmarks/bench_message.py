@@ -0,0 +1,32 @@
+"""Message 与 ConsoleMessage 互相转换的耗时基准
+
+用法: python benchmarks/bench_message.py
+"""
+
+import timeit
+
+from nonebot.adapters.console.message import Message, MessageSegment
+
+
+def make_message(size: int) -> Message:
+    factories = (
+        lambda i: MessageSegment.text(f"line {i}"),
+        lambda i: MessageSegment.emoji("smile"),
+        lambda i: MessageSegment.markup(f"[b]{i}[/b]"),
+        lambda i: MessageSegment.markdown(f"**{i}**"),
+    )
+    return Message([factories[i % len(factories)](i) for i in range(size)])
+
+
+def main() -> None:
+    for size in (1, 10, 100, 1000, 10000):
+        message = make_message(size)
+        console_message = message._to_console_message()
+        number = max(10, 20000 // size)
+        to_cost = timeit.timeit(message._to_console_message, number=number) / number
+        from_cost = timeit.timeit(lambda: Message._from_console_message(console_message), number=number) / number
+        print(f"segments={size:<6} to_console {to_cost * 1e6:10.1f} us  from_console {from_cost * 1e6:10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Console 适配器入站与出站链路基准
+
+在 headless 模式下运行, 不需要 TTY:
+
+- inbound: `AdapterConsoleBackend.post_event` -> `Adapter.post_event` -> `Bot.handle_event` -> matcher
+- outbound: `Bot.send` -> `Message.to_console_message` -> `Adapter._call_api("send_msg")`
+
+用法: python benchmarks/bench_pipeline.py --count 2000 --output bench.json
+"""
+
+import sys
+import json
+import asyncio
+import argparse
+import platform
+import tracemalloc
+from datetime import datetime
+from time import perf_counter
+from statistics import quantiles
+from typing import Any, Callable
+
+from nonechat.message import Text, Emoji, Markup, Markdown, ConsoleMessage
+
+import nonebot
+
+SIZES = (1, 10, 100)
+MIXES: dict[str, Callable[[int], Any]] = {
+    "text": lambda i: Text(f"hello {i}"),
+    "mixed": lambda i: (Text(f"hello {i}"), Emoji("smile"), Markup(f"[b]{i}[/b]"), Markdown(f"**{i}**"))[i % 4],
+}
+
+
+def make_content(size: int, mix: str) -> ConsoleMessage:
+    return ConsoleMessage([MIXES[mix](i) for i in range(size)])
+
+
+def summarize(latencies: list[float], elapsed: float, peak: int) -> dict[str, Any]:
+    cuts = quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "count": len(latencies),
+        "per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": cuts[49] * 1000,
+        "p99_ms": cuts[98] * 1000,
+        "peak_memory_kib": peak / 1024,
+    }
+
+
+async def measure(run: Callable[[], Any]) -> tuple[list[float], float, int]:
+    """执行两次: 第一次计时, 第二次在 tracemalloc 下统计峰值内存"""
+    start = perf_counter()
+    latencies = await run()
+    elapsed = perf_counter() - start
+    tracemalloc.start()
+    await run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return latencies, elapsed, peak
+
+
+async def bench_inbound(adapter, received: dict[str, float], size: int, mix: str, count: int):
+    frontend = adapter.frontend
+    content = make_content(size, mix)
+
+    async def run():
+        latencies: list[float] = []
+        received.clear()
+        starts: dict[str, float] = {}
+        events = [frontend.create_message_event(content) for _ in range(count)]
+        for event in events:
+            starts[event.message_id] = perf_counter()
+            await frontend.backend.post_event(event)
+        await adapter.dispatcher.join()
+        latencies.extend(received[message_id] - start for message_id, start in starts.items())
+        return latencies
+
+    return summarize(*await measure(run))
+
+
+async def bench_outbound(adapter, size: int, mix: str, count: int):
+    from nonebot.adapters.console.message import Message
+    from nonebot.adapters.console.event import MessageEvent
+
+    bot = next(iter(adapter.bots.values()))
+    event = MessageEvent.from_console_event(adapter.frontend.create_message_event("ping"))
+    message = Message.from_console_message(make_content(size, mix))
+
+    async def run():
+        latencies: list[float] = []
+        for _ in range(count):
+            start = perf_counter()
+            await bot.send(event, message)
+            latencies.append(perf_counter() - start)
+        return latencies
+
+    return summarize(*await measure(run))
+
+
+async def main(args: argparse.Namespace) -> dict[str, Any]:
+    nonebot.init(
+        driver="~none",
+        log_level="WARNING",
+        console_headless_mode=True,
+        console_message_retention=args.count,
+    )
+
+    from nonebot import on_message
+    from nonebot.adapters.console import Adapter
+    from nonebot.adapters.console.event import MessageEvent
+
+    driver = nonebot.get_driver()
+    driver.register_adapter(Adapter)
+    received: dict[str, float] = {}
+
+    @on_message(block=True).handle()
+    async def _(event: MessageEvent):
+        received[event.message_id] = perf_counter()
+
+    await driver._lifespan.startup()
+    adapter = nonebot.get_adapter(Adapter)
+    # 预热
+    await bench_inbound(adapter, received, 1, "text", 100)
+
+    results = []
+    for size in args.sizes:
+        for mix in MIXES:
+            inbound = await bench_inbound(adapter, received, size, mix, args.count)
+            outbound = await bench_outbound(adapter, size, mix, args.count)
+            results.append({"segments": size, "mix": mix, "inbound": inbound, "outbound": outbound})
+            print(
+                f"segments={size:<4} mix={mix:<6} "
+                f"in {inbound['per_second']:9.0f}/s p50 {inbound['p50_ms']:7.3f}ms p99 {inbound['p99_ms']:7.3f}ms  "
+                f"out {outbound['per_second']:9.0f}/s p50 {outbound['p50_ms']:7.3f}ms p99 {outbound['p99_ms']:7.3f}ms",
+                file=sys.stderr,
+            )
+    await driver._lifespan.shutdown()
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "python": sys.version,
+        "platform": platform.platform(),
+        "count": args.count,
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=2000, help="每个用例的事件/消息数量")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="消息段数量")
+    parser.add_argument("--output", default="-", help="结果 JSON 文件, 默认输出到标准输出")
+    args = parser.parse_args()
+    report = asyncio.run(main(args))
+    if args.output == "-":
+        print(json.dumps(report, indent=2))
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
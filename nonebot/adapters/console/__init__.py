@@ -1,5 +1,4 @@
-from nonechat.model import User as User
-from nonechat.model import Channel as Channel
+from typing import TYPE_CHECKING, Any
 
 from .bot import Bot as Bot
 from .event import Event as Event
@@ -7,3 +6,16 @@ from .adapter import Adapter as Adapter
 from .message import Message as Message
 from .event import MessageEvent as MessageEvent
 from .message import MessageSegment as MessageSegment
+
+if TYPE_CHECKING:
+    from nonechat.model import User as User
+    from nonechat.model import Channel as Channel
+
+
+def __getattr__(name: str) -> Any:
+    # nonechat 的模型会导入 Textual, 在首次访问时才导入
+    if name in ("User", "Channel"):
+        from nonechat import model
+
+        return getattr(model, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,12 +1,14 @@
 import sys
+import time
 import asyncio
-from collections.abc import Awaitable
+from pathlib import Path
+from datetime import datetime
+from time import perf_counter
 from typing_extensions import override
-from typing import Any, Callable, Optional
+from collections.abc import Iterable, Awaitable
+from typing import TYPE_CHECKING, Any, Union, Literal, Callable, Optional
 
-from textual.color import Color
-from nonebot.drivers import Driver
-from nonechat import Frontend, ConsoleSetting
+from nonebot.drivers import URL, Driver, Request, Response, ASGIMixin, HTTPServerSetup
 
 from nonebot import get_plugin_config
 from nonebot.adapters import Adapter as BaseAdapter
@@ -15,21 +17,73 @@ from .bot import Bot
 from .utils import log
 from .event import Event
 from .config import Config
+from .message import Message
+from .api import API_HANDLERS
+from .reload import PluginReloader
+from .outgoing import OutgoingQueue
+from .simulation import VirtualClock
 from .exception import ApiNotAvailable
-from .backend import AdapterConsoleBackend
+from .headless import HeadlessFrontend
+from .dispatcher import EventDispatcher
+from .metrics import Metrics, CallStats
+from .profiler import Profiler, ProfileMode
+from .recording import SessionRecorder, replay
+
+if TYPE_CHECKING:
+    from nonechat import Frontend
+    from nonechat.model import Event as ConsoleEvent
+
+    from .remote import RemoteServer
+    from .backend import AdapterConsoleBackend
 
 
 class Adapter(BaseAdapter):
-    _frontend: Frontend[AdapterConsoleBackend]
+    _frontend: Union["Frontend[AdapterConsoleBackend]", "HeadlessFrontend[AdapterConsoleBackend]"]
 
     @override
     def __init__(self, driver: Driver, **kwargs: Any) -> None:
         super().__init__(driver, **kwargs)
         self.console_config = get_plugin_config(Config)
         self._task: Optional[asyncio.Task] = None
+        self.dispatcher = EventDispatcher(
+            self.console_config.console_dispatch_concurrency,
+            self.console_config.console_dispatch_queue_size,
+            self.console_config.console_dispatch_overflow,
+            self.console_config.console_dispatch_ordered,
+        )
+        Message.to_console_cache.maxsize = self.console_config.console_message_cache_size
+        Message.from_console_cache.maxsize = self.console_config.console_message_cache_size
+        self.unknown_bot_events = 0
+        """因机器人不存在而丢弃的事件数量"""
+        self._unknown_bots: set[str] = set()
+        self.api_stats: dict[str, CallStats] = {}
+        """各 API 的调用次数与耗时统计"""
+        self.metrics = Metrics(self.console_config.console_metrics)
+        self._metrics_task: Optional[asyncio.Task] = None
+        self.outgoing = OutgoingQueue(
+            self,
+            self.console_config.console_send_batch_window,
+            self.console_config.console_send_batch_size,
+        )
+
+        self.recorder: Optional[SessionRecorder] = None
+        """会话录制器, 配置 `console_record_file` 后在启动时创建"""
+
+        self.remote: Optional[RemoteServer] = None
+        """远程前端服务端, 配置 `console_remote` 后在启动时创建"""
+
+        self.clock: Optional[VirtualClock] = None
+        """虚拟时钟, 配置 `console_simulation` 后在启动时创建"""
+
+        self.reloader: Optional[PluginReloader] = None
+        """插件热重载, 配置 `console_reload` 后在启动时创建"""
+
+        self.profiler: Optional[Profiler] = None
+        """最近一次的性能分析, 通过 `start_profile` 创建"""
 
         self._stdout = sys.stdout
         self.clients: list[Callable[[Bot, str, dict[str, Any]], Awaitable[Any]]] = []
+        """API 调用结果的监听回调, 参数为机器人、API 名称与附带 `result` 的调用参数"""
 
         self.setup()
 
@@ -38,64 +92,211 @@ class Adapter(BaseAdapter):
     def get_name(cls) -> str:
         return "Console"
 
+    @property
+    def frontend(self) -> Union["Frontend[AdapterConsoleBackend]", "HeadlessFrontend[AdapterConsoleBackend]"]:
+        """当前使用的前端"""
+        return self._frontend
+
     def setup(self):
-        if not self.console_config.console_headless_mode:
-            self.driver.on_startup(self._start)
-            self.driver.on_shutdown(self._shutdown)
+        self.driver.on_startup(self._start)
+        self.driver.on_shutdown(self._shutdown)
+        if self.metrics.enabled and isinstance(self.driver, ASGIMixin):
+            self.setup_http_server(
+                HTTPServerSetup(URL("/console/metrics"), "GET", "console_metrics", self._handle_metrics)
+            )
+
+    def dump_metrics(self, fmt: Optional[Literal["prometheus", "json"]] = None) -> str:
+        """导出统计信息
+
+        Args:
+            fmt (Optional[Literal["prometheus", "json"]]): 导出格式, 默认为 `console_metrics_format`
+        """
+        if (fmt or self.console_config.console_metrics_format) == "json":
+            return self.metrics.to_json(self)
+        return self.metrics.to_prometheus(self)
+
+    async def _handle_metrics(self, request: Request) -> Response:
+        fmt = request.url.query.get("format")
+        content = self.dump_metrics("json" if fmt == "json" else "prometheus" if fmt else None)
+        content_type = "application/json" if content.startswith("{") else "text/plain; version=0.0.4"
+        return Response(200, headers={"Content-Type": content_type}, content=content)
+
+    def _write_metrics(self, path: Path) -> None:
+        tmp = path.with_name(f"{path.name}.tmp")
+        tmp.write_text(self.dump_metrics(), encoding="utf-8")
+        tmp.replace(path)
+
+    async def _dump_metrics_loop(self, path: Path) -> None:
+        while True:
+            await asyncio.sleep(self.console_config.console_metrics_interval)
+            try:
+                self._write_metrics(path)
+            except OSError as e:
+                log("WARNING", f"Failed to write metrics to {path}", e)
 
     async def _start(self) -> None:
-        self._frontend = Frontend(
-            AdapterConsoleBackend,
-            ConsoleSetting(
+        # nonechat 的模块均会导入 Textual, 仅在启动前端时导入
+        from .backend import AdapterConsoleBackend
+
+        config = self.console_config
+        if config.console_headless_mode or config.console_remote or config.console_simulation:
+            self._frontend = HeadlessFrontend(AdapterConsoleBackend)
+        else:
+            from textual.color import Color
+            from nonechat.app import Frontend
+            from nonechat.setting import ConsoleSetting
+
+            setting = ConsoleSetting(
                 title="Nonebot",
                 sub_title="welcome to Console",
                 toolbar_exit="❌",
                 icon_color=Color.parse("#EA5252"),
-            ),
-        )
+            )
+            self._frontend = Frontend(AdapterConsoleBackend, setting)
         self._frontend.backend.set_adapter(self)
+        if config.console_simulation:
+            self.clock = VirtualClock(config.console_simulation_start)
+            self.clock.install(asyncio.get_running_loop())
+            self._frontend.clock = self.clock  # type: ignore
         self._frontend.backend.current_bot.id = self.console_config.console_bot_id
         self._frontend.backend.current_bot.nickname = self.console_config.console_bot_name
-        self._task = asyncio.create_task(self._frontend.run_async())
+        if path := self.console_config.console_record_file:
+            self.recorder = SessionRecorder(path)
+        if self.metrics.enabled and (path := self.console_config.console_metrics_file):
+            self._metrics_task = asyncio.create_task(self._dump_metrics_loop(path))
+        if isinstance(self._frontend, HeadlessFrontend):
+            await self._frontend.run_async()
+            if address := self.console_config.console_remote:
+                from .remote import RemoteServer
+
+                self.remote = RemoteServer(self)
+                await self.remote.start(address)
+        else:
+            self._task = asyncio.create_task(self._frontend.run_async())
+        if config.console_reload:
+            self.reloader = PluginReloader(self, config.console_reload_interval)
+            self.reloader.start()
 
     async def _shutdown(self) -> None:
-        if self._frontend:
+        self.stop_profile()
+        if self.reloader is not None:
+            self.reloader.stop()
+            self.reloader = None
+        if self.remote is not None:
+            await self.remote.close()
+            self.remote = None
+        if getattr(self, "_frontend", None):
+            self.outgoing.flush()
             self._frontend.exit()
         if self._task:
             await self._task
+        await self.dispatcher.shutdown(self.console_config.console_dispatch_shutdown_timeout)
+        if getattr(self, "_frontend", None):
+            self._frontend.backend.close()
+        if self._metrics_task:
+            self._metrics_task.cancel()
+            path: Path = self.console_config.console_metrics_file  # type: ignore
+            try:
+                self._write_metrics(path)
+            except OSError as e:
+                log("WARNING", f"Failed to write metrics to {path}", e)
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
         for bot in self.bots.copy().values():
             self.bot_disconnect(bot)
+        if self.clock is not None:
+            self.clock.uninstall()
+
+    async def inject_events(self, events: Iterable["ConsoleEvent"], record: bool = True) -> int:
+        """在 headless 模式下批量注入事件
+
+        Args:
+            events (Iterable[ConsoleEvent]): 要注入的事件
+            record (bool): 是否将消息事件写入聊天记录
+
+        Returns:
+            int: 注入的事件数量
+        """
+        if not isinstance(getattr(self, "_frontend", None), HeadlessFrontend):
+            raise ApiNotAvailable("Event injection is only available in headless mode")
+        return await self._frontend.post_events(events, record)  # type: ignore
+
+    async def replay(self, path: Union[str, Path], speed: Optional[float] = 1.0) -> int:
+        """回放录制的会话
+
+        Args:
+            path (Union[str, Path]): 录制文件路径
+            speed (Optional[float]): 回放速度倍率, 为 None 或不大于 0 时尽快回放
+
+        Returns:
+            int: 回放的事件数量
+        """
+        return await replay(self, path, speed)
+
+    def now(self) -> datetime:
+        """当前时间, 模拟模式下为虚拟时间"""
+        return datetime.now() if self.clock is None else self.clock.now()
+
+    def start_profile(
+        self,
+        events: Optional[int] = None,
+        seconds: Optional[float] = None,
+        mode: ProfileMode = "cprofile",
+        output: Union[str, Path, None] = None,
+    ) -> Profiler:
+        """开始分析接下来的事件处理, 同一时间只能进行一次分析
+
+        Args:
+            events (Optional[int]): 最多分析的事件数量, 为 None 时不限制
+            seconds (Optional[float]): 最长分析时间, 为 None 时不限制
+            mode (ProfileMode): `cprofile` 输出 pstats 文件, `sample` 输出 collapsed stack 文件
+            output (Union[str, Path, None]): 结果目录, 默认为 `console_profile_dir` 下以开始时间命名的目录
+        """
+        if self.profiler is not None and not self.profiler.done.is_set():
+            raise RuntimeError("Another profile is still running")
+        if output is None:
+            output = self.console_config.console_profile_dir / time.strftime("%Y%m%d-%H%M%S")
+        self.profiler = Profiler(Path(output), mode, events, seconds)
+        log("INFO", f"Profiling started, results will be written to {output}")
+        return self.profiler
+
+    def stop_profile(self) -> Optional[Profiler]:
+        """停止当前的性能分析, 返回该分析; 没有进行中的分析时返回 None"""
+        if self.profiler is None or not self.profiler.active:
+            return None
+        self.profiler.stop()
+        return self.profiler
 
-    def post_event(self, event: Event) -> None:
-        if event.self_id not in self.bots:
-            log("WARNING", f"Received event from unknown bot {event.self_id}.")
-        bot: Bot = self.bots[event.self_id]  # type: ignore
-        asyncio.create_task(bot.handle_event(event))
+    async def post_event(self, event: Event) -> None:
+        if (bot := self.bots.get(event.self_id)) is None:
+            self.unknown_bot_events += 1
+            # 每个未知机器人只警告一次, 避免压测时刷屏
+            if event.self_id not in self._unknown_bots:
+                self._unknown_bots.add(event.self_id)
+                log("WARNING", f"Received event from unknown bot {event.self_id}, dropped.")
+            return
+        await self.dispatcher.put(bot, event)  # type: ignore
 
     @override
     async def _call_api(self, bot: Bot, api: str, **data: Any):
-        if api == "send_msg":
-            return await self._frontend.send_message(**data, bot=bot.info)
-        if api == "bell":
-            return await self._frontend.toggle_bell()
-        if api == "get_user":
-            return await self._frontend.backend.get_user(data["user_id"])
-        if api == "get_channel":
-            return await self._frontend.backend.get_channel(data["channel_id"])
-        if api == "get_users":
-            return await self._frontend.backend.list_users()
-        if api == "list_channels":
-            return await self._frontend.backend.list_channels(data.get("list_users", False))
-        if api == "create_dm":
-            user = await self._frontend.backend.get_user(data["user_id"])
-            return await self._frontend.backend.create_dm(user)
-        if api == "get_msg":
-            channel = await self._frontend.backend.get_channel(data["channel_id"])
-            return await self._frontend.backend.get_chat(data["message_id"], channel)
-        if api == "recall_msg":
-            channel = await self._frontend.backend.get_channel(data["channel_id"])
-            return await self._frontend.recall_message(data["message_id"], channel)
-        if api == "edit_msg":
-            channel = await self._frontend.backend.get_channel(data["channel_id"])
-            return await self._frontend.edit_message(data["message_id"], data["content"], channel)
-        raise ApiNotAvailable(f"API {api} is not available in Console adapter")
+        if (handler := API_HANDLERS.get(api)) is None:
+            raise ApiNotAvailable(f"API {api} is not available in Console adapter")
+        if (stats := self.api_stats.get(api)) is None:
+            stats = self.api_stats[api] = CallStats()
+        if self.recorder is not None:
+            if api == "send_msg":
+                self.recorder.record_send(bot.self_id, data["channel"], [data["content"]])
+            elif api == "send_msgs":
+                self.recorder.record_send(bot.self_id, data["channel"], data["contents"])
+        start = perf_counter()
+        try:
+            result = await handler(self, bot, data)
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            stats.latency.observe(perf_counter() - start)
+        for client in self.clients:
+            await client(bot, api, {**data, "result": result})
+        return result
@@ -0,0 +1,128 @@
+from collections.abc import Awaitable
+from typing import TYPE_CHECKING, Any, Callable
+
+from .event import DIRECT_ID
+
+if TYPE_CHECKING:
+    from .bot import Bot
+    from .adapter import Adapter
+
+ApiHandler = Callable[["Adapter", "Bot", dict[str, Any]], Awaitable[Any]]
+
+API_HANDLERS: dict[str, ApiHandler] = {}
+"""Console 适配器支持的 API, 以 API 名称为键"""
+
+
+def register_api(name: str) -> Callable[[ApiHandler], ApiHandler]:
+    """注册一个 API 处理函数, 同名 API 会被覆盖
+
+    处理函数接收适配器、调用的机器人与调用参数字典::
+
+        @register_api("ping")
+        async def ping(adapter: Adapter, bot: Bot, data: dict[str, Any]):
+            return "pong"
+
+    Args:
+        name (str): API 名称
+    """
+
+    def decorator(func: ApiHandler) -> ApiHandler:
+        API_HANDLERS[name] = func
+        return func
+
+    return decorator
+
+
+@register_api("send_msg")
+async def send_msg(adapter: "Adapter", bot: "Bot", data: dict[str, Any]):
+    return await adapter.outgoing.send(bot, data["content"], data["channel"])
+
+
+@register_api("send_msgs")
+async def send_msgs(adapter: "Adapter", bot: "Bot", data: dict[str, Any]):
+    return await adapter.outgoing.send_many(bot, data["contents"], data["channel"])
+
+
+@register_api("bell")
+async def bell(adapter: "Adapter", bot: "Bot", data: dict[str, Any]):
+    return await adapter.frontend.toggle_bell()
+
+
+@register_api("get_user")
+async def get_user(adapter: "Adapter", bot: "Bot", data: dict[str, Any]):
+    return await adapter.frontend.backend.get_user(data["user_id"])
+
+
+@register_api("get_channel")
+async def get_channel(adapter: "Adapter", bot: "Bot", data: dict[str, Any]):
+    return await adapter.frontend.backend.get_channel(data["channel_id"])
+
+
+@register_api("get_users")
+@register_api("list_users")
+async def list_users(adapter: "Adapter", bot: "Bot", data: dict[str, Any]):
+    return adapter.frontend.backend.storage.page_users(data.get("after"), data.get("limit"))
+
+
+@register_api("list_channels")
+async def list_channels(adapter: "Adapter", bot: "Bot", data: dict[str, Any]):
+    backend = adapter.frontend.backend
+    if data.get("after") is None and data.get("limit") is None:
+        return await backend.list_channels(data.get("list_users", False))
+    return backend.storage.page_channels(data.get("after"), data.get("limit"))
+
+
+@register_api("create_users")
+async def create_users(adapter: "Adapter", bot: "Bot", data: dict[str, Any]):
+    return await adapter.frontend.backend.add_users(data["users"])
+
+
+@register_api("create_channels")
+async def create_channels(adapter: "Adapter", bot: "Bot", data: dict[str, Any]):
+    return await adapter.frontend.backend.add_channels(data["channels"])
+
+
+@register_api("create_dm")
+async def create_dm(adapter: "Adapter", bot: "Bot", data: dict[str, Any]):
+    user = await adapter.frontend.backend.get_user(data["user_id"])
+    return await adapter.frontend.backend.create_dm(user)
+
+
+@register_api("get_msg")
+async def get_msg(adapter: "Adapter", bot: "Bot", data: dict[str, Any]):
+    channel = await adapter.frontend.backend.get_channel(data["channel_id"])
+    return await adapter.frontend.backend.get_chat(data["message_id"], channel)
+
+
+@register_api("recall_msg")
+async def recall_msg(adapter: "Adapter", bot: "Bot", data: dict[str, Any]):
+    channel = await adapter.frontend.backend.get_channel(data["channel_id"])
+    return await adapter.frontend.recall_message(data["message_id"], channel)
+
+
+@register_api("get_msg_history")
+async def get_msg_history(adapter: "Adapter", bot: "Bot", data: dict[str, Any]):
+    backend = adapter.frontend.backend
+    channel = await backend.get_channel(data["channel_id"])
+    if channel.id == DIRECT_ID:
+        channel = await backend.create_dm(backend.current_user)
+    return backend.storage.store.page(channel.id, data.get("after"), data.get("limit", 50))
+
+
+@register_api("edit_msg")
+async def edit_msg(adapter: "Adapter", bot: "Bot", data: dict[str, Any]):
+    channel = await adapter.frontend.backend.get_channel(data["channel_id"])
+    return await adapter.frontend.edit_message(data["message_id"], data["content"], channel)
+
+
+@register_api("start_profile")
+async def start_profile(adapter: "Adapter", bot: "Bot", data: dict[str, Any]):
+    profiler = adapter.start_profile(
+        data.get("events"), data.get("seconds"), data.get("mode", "cprofile"), data.get("output")
+    )
+    return str(profiler.output)
+
+
+@register_api("stop_profile")
+async def stop_profile(adapter: "Adapter", bot: "Bot", data: dict[str, Any]):
+    return None if (profiler := adapter.stop_profile()) is None else str(profiler.output)
@@ -1,22 +1,25 @@
-from typing import TYPE_CHECKING, Optional, cast
+from time import perf_counter
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, Any, Optional, cast
 
-from loguru import _colorama
 from nonechat import Backend
-from nonechat.model import Robot
-from loguru._logger import Logger
-from nonechat.app import Frontend
-from loguru._handler import Handler
-from nonechat.backend import BotAdd
+from nonechat.model import DIRECT, User
 from nonebot.log import logger, logger_id
-from loguru._simple_sinks import StreamSink
+from nonechat.model import Robot, Channel
 from nonechat.model import Event as ConsoleEvent
+from nonechat.backend import BotAdd, UserAdd, ChannelAdd
 from nonechat.model import MessageEvent as ConsoleMessageEvent
 
 from .bot import Bot
-from .message import Message
+from .logsink import BufferedLogSink
 from .event import Event, MessageEvent
+from .store import ConsoleStorage, MemoryMessageStore, SQLiteMessageStore
 
 if TYPE_CHECKING:
+    from loguru._logger import Logger
+    from nonechat.app import Frontend
+    from loguru._handler import Handler
+
     from .adapter import Adapter
 
 
@@ -26,57 +29,188 @@ class AdapterConsoleBackend(Backend):
     def __init__(self, frontend: "Frontend"):
         super().__init__(frontend)
         self.current_user.id = "user"
-        self._origin_sink: Optional[StreamSink] = None
+        self._origin_sink: Optional[Any] = None
+        self.log_sink: Optional[BufferedLogSink] = None
+        """前端日志缓冲区, 在控制台加载后创建"""
+        self._dm_channels: dict[str, Channel] = {}
 
     def set_adapter(self, adapter: "Adapter"):
         self._adapter = adapter
+        config = adapter.console_config
+        if config.console_message_store == "sqlite":
+            store = SQLiteMessageStore(config.console_message_store_path, config.console_message_retention)
+        else:
+            store = MemoryMessageStore(config.console_message_retention)
+        self.storage = ConsoleStorage(store)
+
+    def close(self):
+        if isinstance(self.storage, ConsoleStorage):
+            self.storage.store.close()
 
     def on_console_load(self):
-        current_handler: Handler = cast(Logger, logger)._core.handlers[logger_id]
-        if current_handler._colorize and _colorama.should_wrap(self.frontend._fake_output):
-            stream = _colorama.wrap(self.frontend._fake_output)
-        else:
-            stream = self.frontend._fake_output
+        config = self._adapter.console_config
+        level = config.console_log_level
+        if isinstance(level, str):
+            level = logger.level(level.upper()).no
+        self.log_sink = BufferedLogSink(self.frontend.log_store, config.console_log_buffer_size, level or 0)
+        current_handler: Handler = cast("Logger", logger)._core.handlers[logger_id]
         self._origin_sink = current_handler._sink
-        current_handler._sink = StreamSink(stream)
+        current_handler._sink = self.log_sink
+
+    def intern_user(self, user: User) -> User:
+        """返回与 `user` 同 ID 的共享实例
+
+        未知用户会被登记并与 `add_users` 一样通知前端; 昵称或头像发生变化时以新实例替换旧实例, 并使对应的私聊频道失效。
+        机器人只查找不登记。
+        """
+        if isinstance(user, Robot):
+            return self.storage.bots.get(user.id, user)
+        known = self.storage.users.get(user.id)
+        if known is user:
+            return user
+        if known is None or known.nickname != user.nickname or known.avatar != user.avatar:
+            if known is None:
+                if self.storage.add_user(user):
+                    for watcher in self.user_watchers:
+                        watcher.post_message(UserAdd(user))
+            else:
+                self.storage.users[user.id] = user
+            self._dm_channels.pop(f"private:{user.id}", None)
+            return user
+        return known
+
+    def intern_channel(self, channel: Channel) -> Channel:
+        """返回与 `channel` 同 ID 的共享实例
+
+        未知频道会被登记并通知前端, 私聊频道与频道列表分开保存; 名称、描述或头像发生变化时以新实例替换旧实例。
+        """
+        if channel.id == DIRECT.id:
+            return DIRECT
+        index = self._dm_channels if channel.id.startswith("private:") else self.storage.channels
+        known = index.get(channel.id)
+        if known is channel:
+            return channel
+        if (
+            known is None
+            or known.name != channel.name
+            or known.description != channel.description
+            or known.avatar != channel.avatar
+        ):
+            if known is None and index is self.storage.channels:
+                if self.storage.add_channel(channel):
+                    for watcher in self.channel_wathers:
+                        watcher.post_message(ChannelAdd(channel))
+            else:
+                index[channel.id] = channel
+            return channel
+        return known
 
-    async def add_bot(self, bot: Robot):
+    def lookup_channel(self, channel_id: str) -> Optional[Channel]:
+        """按 ID 查找频道, 包括已创建的私聊频道"""
+        if (channel := self.storage.channels.get(channel_id)) is not None:
+            return channel
+        if (channel := self._dm_channels.get(channel_id)) is not None:
+            return channel
+        if channel_id == DIRECT.id:
+            return DIRECT
+        if channel_id == self.current_channel.id:
+            return self.current_channel
+        return None
+
+    async def get_channel(self, channel_id: str) -> Channel:
+        if (channel := self.lookup_channel(channel_id)) is not None:
+            return channel
+        if channel_id.startswith("private:") and (user := self.storage.users.get(channel_id[8:])):
+            return await self.create_dm(user)
+        raise ValueError(f"Channel with ID {channel_id} not found in storage.")
+
+    async def create_dm(self, user: User) -> Channel:
+        if (channel := self._dm_channels.get(f"private:{user.id}")) is not None:
+            return channel
+        channel = await super().create_dm(user)
+        self._dm_channels[channel.id] = channel
+        return channel
+
+    async def add_users(self, users: Iterable[User]) -> int:
+        """批量登记用户, 已存在的用户会被跳过, 返回新登记的数量"""
+        added = [user for user in users if self.storage.add_user(user)]
+        for watcher in self.user_watchers:
+            for user in added:
+                watcher.post_message(UserAdd(user))
+        return len(added)
+
+    async def add_channels(self, channels: Iterable[Channel]) -> int:
+        """批量登记频道, 已存在的频道会被跳过, 返回新登记的数量"""
+        added = [channel for channel in channels if self.storage.add_channel(channel)]
+        for watcher in self.channel_wathers:
+            for channel in added:
+                watcher.post_message(ChannelAdd(channel))
+        return len(added)
+
+    async def add_bot(self, bot: Robot, strict_tome: Optional[bool] = None):
         if self.storage.add_bot(bot):
             for watcher in self.bot_watchers:
                 watcher.post_message(BotAdd(bot))
-            self._adapter.bot_connect(Bot(self._adapter, bot))
+            self._adapter.bot_connect(Bot(self._adapter, bot, strict_tome))
+        if bot is self.current_bot:
+            # 默认机器人注册后再注册配置中的其他机器人
+            for option in self._adapter.console_config.console_bots:
+                if option.id not in self._adapter.bots:
+                    await self.add_bot(Robot(option.id, nickname=option.name), option.strict_tome)
+
+    def write_chats(self, messages: list[ConsoleMessageEvent], channel: Channel) -> list[str]:
+        """批量写入聊天记录, 并只通知一次前端刷新"""
+        message_ids = [self.storage.write_chat(message, channel) for message in messages]
+        self.emit_chat_watcher(*messages)
+        if (
+            messages
+            and not self.frontend.is_bot_mode
+            and channel.id != self.current_channel.id
+            and channel.id == f"private:{self.current_user.id}"
+        ):
+            self.frontend.notify(
+                f"Message from {messages[-1].user.nickname}: {messages[-1].message!s}",
+                title="New Message",
+                timeout=1,
+            )
+        return message_ids
 
     async def on_console_mount(self):
+        if self.log_sink is not None:
+            rate = self._adapter.console_config.console_log_flush_rate
+            self.frontend.set_interval(1 / rate if rate > 0 else 0.1, self.log_sink.drain)
         logger.success("Console mounted.")
 
     async def on_console_unmount(self):
         if self._origin_sink is not None:
-            current_handler: Handler = cast(Logger, logger)._core.handlers[logger_id]
+            current_handler: Handler = cast("Logger", logger)._core.handlers[logger_id]
             current_handler._sink = self._origin_sink
             self._origin_sink = None
+        if self.log_sink is not None:
+            self.log_sink.drain()
         logger.success("Console unmounted.")
         logger.warning("Press Ctrl-C for Application exit")
 
     async def post_event(self, event: ConsoleEvent):
+        metrics = self._adapter.metrics
+        start = perf_counter() if metrics.enabled else 0.0
+        if (recorder := self._adapter.recorder) is not None:
+            recorder.record_event(event)
+        event.user = self.intern_user(event.user)
+        event.channel = self.intern_channel(event.channel)
         if isinstance(event, ConsoleMessageEvent):
-            self._adapter.post_event(
-                MessageEvent(
-                    time=event.time,
-                    self_id=event.self_id,
-                    user=event.user,
-                    post_type="message",
-                    message_id=event.message_id,
-                    message=Message.from_console_message(event.message),
-                    channel=event.channel,
-                ).convert()
-            )
+            converted = MessageEvent.from_console_event(event)
+            if metrics.enabled:
+                metrics.observe("convert", perf_counter() - start)
         else:
-            self._adapter.post_event(
-                Event(
-                    time=event.time,
-                    self_id=event.self_id,
-                    user=event.user,
-                    post_type=event.type,
-                    channel=event.channel,
-                )
+            converted = Event(
+                time=event.time,
+                self_id=event.self_id,
+                user=event.user,
+                post_type=event.type,
+                channel=event.channel,
             )
+        await self._adapter.post_event(converted)
+        if metrics.enabled:
+            metrics.count_event()
+            metrics.observe("post_event", perf_counter() - start)
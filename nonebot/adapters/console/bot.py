@@ -1,58 +1,77 @@
 import re
+from time import perf_counter
 from typing_extensions import override
-from typing import TYPE_CHECKING, Any, Union
+from collections.abc import Iterable, AsyncIterator
+from typing import TYPE_CHECKING, Any, Union, Literal, Optional
 
 from nonebot.message import handle_event
-from nonechat.model import User, Robot, Channel
 
 from nonebot.adapters import Bot as BaseBot
 
 from .utils import log
+from .stream import MessageStream
 from .message import Message, MessageSegment
 from .event import Event, MessageEvent, MessageResponse
 
 if TYPE_CHECKING:
-    from .adapter import Adapter
-
-
-def _check_at_me(bot: "Bot", event: MessageEvent):
+    from nonechat.model import User, Robot, Channel
 
-    message = event.get_message()
+    from .adapter import Adapter
 
-    # ensure message is not empty
-    if not message:
-        message.append(MessageSegment.text(""))
 
-    if message[0].type == "text":
-        if message[0].data["text"].startswith(f"@{bot.self_id}"):
-            event.to_me = True
-            message[0].data["text"] = message[0].data["text"][len(f"@{bot.self_id}") :].lstrip("\xa0").lstrip()
-        elif message[0].data["text"].startswith(f"@{bot.info.nickname}"):
-            event.to_me = True
-            message[0].data["text"] = message[0].data["text"][len(f"@{bot.info.nickname}") :].lstrip("\xa0").lstrip()
-        if not message[0].data["text"]:
-            del message[0]
+def _compile_tome(self_id: str, bot_nickname: str, nicknames: Iterable[str]) -> tuple[re.Pattern, re.Pattern]:
+    """构造 to_me 前缀匹配的正则
 
-    if not message:
-        message.append(MessageSegment.text(""))
+    返回的第一个正则在一次匹配中依次识别 `@{self_id}`/`@{bot_nickname}` 与配置中的昵称,
+    第二个正则仅识别配置中的昵称。
+    """
+    at = rf"@(?:{re.escape(self_id)}|{re.escape(bot_nickname)})\s*"
+    if names := "|".join(re.escape(n) for n in nicknames):
+        nickname = rf"(?i:(?P<nick>{names}))[\s,，]*"
+    else:
+        nickname = r"(?P<nick>(?!))"
+    return re.compile(rf"(?P<at>{at})?(?:{nickname})?"), re.compile(nickname)
 
 
-def _check_nickname(bot: "Bot", event: MessageEvent) -> None:
+def _check_nickname(event: MessageEvent, pattern: re.Pattern) -> None:
     first_msg_seg = event.message[0]
     if first_msg_seg.type != "text":
         return
+    first_text = first_msg_seg.data["text"]
+    if m := pattern.match(first_text):
+        log("DEBUG", f"User is calling me {m['nick']}")
+        event.to_me = True
+        event.message[0] = MessageSegment.text(first_text[m.end() :])
+
+
+def _check_to_me(bot: "Bot", event: MessageEvent) -> None:
+    message = event.get_message()
+
+    # ensure message is not empty
+    if not message:
+        message.append(MessageSegment.text(""))
 
-    nicknames = {re.escape(n) for n in bot.config.nickname}
-    if not nicknames:
+    if message[0].type != "text":
         return
 
-    # check if the user is calling me with my nickname
-    nickname_regex = "|".join(nicknames)
-    first_text = first_msg_seg.data["text"]
-    if m := re.search(rf"^({nickname_regex})([\s,，]*|$)", first_text, re.IGNORECASE):
-        log("DEBUG", f"User is calling me {m[1]}")
+    # 消息段与 original_message 共享, 需替换而非原地修改
+    pattern, nickname_pattern = bot._get_tome_patterns()
+    text = message[0].data["text"]
+    m = pattern.match(text)
+    at_end = m.end("at") if m["at"] else 0
+    if m["at"]:
+        event.to_me = True
+    if not text[at_end:]:
+        del message[0]
+        if not message:
+            message.append(MessageSegment.text(""))
+        _check_nickname(event, nickname_pattern)
+    elif m["nick"]:
+        log("DEBUG", f"User is calling me {m['nick']}")
         event.to_me = True
-        first_msg_seg.data["text"] = first_text[m.end() :]
+        message[0] = MessageSegment.text(text[m.end() :])
+    elif m["at"]:
+        message[0] = MessageSegment.text(text[at_end:])
 
 
 class Bot(BaseBot):
@@ -62,9 +81,26 @@ class Bot(BaseBot):
 
         async def bell(self) -> None: ...
 
-    def __init__(self, adapter: "Adapter", info: Robot):
+    def __init__(self, adapter: "Adapter", info: "Robot", strict_tome: Optional[bool] = None):
         super().__init__(adapter, info.id)
         self.info = info
+        self.strict_tome = adapter.console_config.console_strict_tome if strict_tome is None else strict_tome
+        """是否仅在明确提及机器人时将消息视为 to_me"""
+        self._tome_nickname: str = ""
+        self._tome_nicknames: frozenset[str] = frozenset()
+        self._tome_patterns: Optional[tuple[re.Pattern, re.Pattern]] = None
+
+    def _get_tome_patterns(self) -> tuple[re.Pattern, re.Pattern]:
+        """获取 to_me 前缀匹配的正则, 仅在机器人昵称或配置昵称变化时重新编译"""
+        if (
+            self._tome_patterns is None
+            or self._tome_nickname != self.info.nickname
+            or self._tome_nicknames != self.config.nickname
+        ):
+            self._tome_nickname = self.info.nickname
+            self._tome_nicknames = frozenset(self.config.nickname)
+            self._tome_patterns = _compile_tome(self.self_id, self._tome_nickname, self._tome_nicknames)
+        return self._tome_patterns
 
     @override
     async def send(
@@ -83,8 +119,46 @@ class Bot(BaseBot):
         )
         return MessageResponse(message_id=msg_id, channel_id=event.channel.id)
 
+    async def send_batch(
+        self,
+        event: Event,
+        messages: Iterable[Union[str, Message, MessageSegment]],
+    ) -> list[MessageResponse]:
+        """批量发送消息到事件所在频道
+
+        消息会合并为一次前端刷新, 并按顺序返回每条消息的发送结果。
+
+        Args:
+            event (Event): 事件
+            messages (Iterable[Union[str, Message, MessageSegment]]): 消息内容
+        """
+        msg_ids = await self.call_api(
+            "send_msgs",
+            contents=[Message(message).to_console_message() for message in messages],
+            channel=event.channel,
+        )
+        return [MessageResponse(message_id=msg_id, channel_id=event.channel.id) for msg_id in msg_ids]
+
+    def send_stream(
+        self,
+        event: Event,
+        message: Union[str, Message, MessageSegment] = "",
+        fps: Optional[float] = None,
+    ) -> MessageStream:
+        """以流式消息回复事件, 返回的对象需作为异步上下文管理器使用
+
+        Args:
+            event (Event): 事件
+            message (Union[str, Message, MessageSegment]): 消息开头的固定内容
+            fps (Optional[float]): 每秒最多编辑的次数, 默认为 `console_stream_fps`
+        """
+        if fps is None:
+            fps = self.adapter.console_config.console_stream_fps
+        return MessageStream(self, event.channel, message, fps)
+
     async def send_private_message(self, user_id: str, message: Union[str, Message, MessageSegment]):
-        channel = await self.create_dm(user_id)
+        backend = self.adapter.frontend.backend
+        channel = backend.lookup_channel(f"private:{user_id}") or await self.create_dm(user_id)
         full_message = Message()
         full_message += message
         msg_id = await self.call_api(
@@ -95,7 +169,8 @@ class Bot(BaseBot):
         return MessageResponse(message_id=msg_id, channel_id=channel.id)
 
     async def send_message(self, channel_id: str, message: Union[str, Message, MessageSegment]):
-        channel = await self.get_channel(channel_id)
+        # 已知频道直接从后端的索引中获取, 无需经过 API 调用
+        channel = self.adapter.frontend.backend.lookup_channel(channel_id) or await self.get_channel(channel_id)
         full_message = Message()
         full_message += message
         msg_id = await self.call_api(
@@ -113,15 +188,31 @@ class Bot(BaseBot):
             channel_id (str): 频道ID
         """
         event = await self.call_api("get_msg", message_id=message_id, channel_id=channel_id)
-        return MessageEvent(
-            time=event.time,
-            self_id=event.self_id,
-            user=event.user,
-            post_type="message",
-            message_id=event.message_id,
-            message=Message.from_console_message(event.message),
-            channel=event.channel,
-        ).convert()
+        return MessageEvent.from_console_event(event)
+
+    async def get_history(self, channel_id: str, after: Optional[str] = None, limit: int = 50) -> list[MessageEvent]:
+        """按时间顺序分页获取频道的聊天记录
+
+        Args:
+            channel_id (str): 频道ID
+            after (Optional[str]): 游标消息ID, 返回该消息之后的消息; 为 None 时从最早的消息开始
+            limit (int): 最多返回的消息数量
+        """
+        events = await self.call_api("get_msg_history", channel_id=channel_id, after=after, limit=limit)
+        return [MessageEvent.from_console_event(event) for event in events]
+
+    async def iter_history(self, channel_id: str, batch_size: int = 100) -> AsyncIterator[MessageEvent]:
+        """按时间顺序逐条遍历频道的聊天记录, 每次最多加载 `batch_size` 条
+
+        Args:
+            channel_id (str): 频道ID
+            batch_size (int): 每页加载的消息数量
+        """
+        after = None
+        while events := await self.get_history(channel_id, after, batch_size):
+            for event in events:
+                yield event
+            after = events[-1].message_id
 
     async def recall_message(self, message_id: str, channel_id: str) -> None:
         """撤回消息
@@ -148,27 +239,78 @@ class Bot(BaseBot):
             "edit_msg", message_id=message_id, content=full_message.to_console_message(), channel_id=channel_id
         )
 
-    async def get_user(self, user_id: str) -> User:
+    async def get_user(self, user_id: str) -> "User":
         """获取用户信息"""
         return await self.call_api("get_user", user_id=user_id)
 
-    async def get_channel(self, channel_id: str) -> Channel:
+    async def get_channel(self, channel_id: str) -> "Channel":
         """获取频道信息"""
         return await self.call_api("get_channel", channel_id=channel_id)
 
-    async def list_users(self) -> list[User]:
-        """获取所有用户信息"""
-        return await self.call_api("list_users")
+    async def list_users(self, after: Optional[str] = None, limit: Optional[int] = None) -> list["User"]:
+        """按登记顺序获取用户信息, 默认获取所有用户
 
-    async def list_channels(self, list_users: bool = False) -> list[Channel]:
+        Args:
+            after (Optional[str]): 游标用户ID, 返回该用户之后登记的用户; 为 None 时从最早登记的用户开始
+            limit (Optional[int]): 最多返回的用户数量, 为 None 时不限制
+        """
+        return await self.call_api("list_users", after=after, limit=limit)
+
+    async def iter_users(self, batch_size: int = 100) -> AsyncIterator["User"]:
+        """按登记顺序逐个遍历用户, 每次最多加载 `batch_size` 个
+
+        Args:
+            batch_size (int): 每页加载的用户数量
+        """
+        after = None
+        while users := await self.list_users(after, batch_size):
+            for user in users:
+                yield user
+            after = users[-1].id
+
+    async def list_channels(
+        self, list_users: bool = False, after: Optional[str] = None, limit: Optional[int] = None
+    ) -> list["Channel"]:
         """获取所有频道信息
 
+        指定 `after` 或 `limit` 时按登记顺序分页获取频道列表中的频道, 不包括私聊频道, 此时忽略 `list_users`
+
         Args:
             list_users (bool): 是否获取私聊用户列表，默认为 False
+            after (Optional[str]): 游标频道ID, 返回该频道之后登记的频道; 为 None 时从最早登记的频道开始
+            limit (Optional[int]): 最多返回的频道数量, 为 None 时不限制
         """
-        return await self.call_api("list_channels", list_users=list_users)
+        return await self.call_api("list_channels", list_users=list_users, after=after, limit=limit)
 
-    async def create_dm(self, user_id: str) -> Channel:
+    async def iter_channels(self, batch_size: int = 100) -> AsyncIterator["Channel"]:
+        """按登记顺序逐个遍历频道列表中的频道, 每次最多加载 `batch_size` 个
+
+        Args:
+            batch_size (int): 每页加载的频道数量
+        """
+        after = None
+        while channels := await self.list_channels(after=after, limit=batch_size):
+            for channel in channels:
+                yield channel
+            after = channels[-1].id
+
+    async def create_users(self, users: Iterable["User"]) -> int:
+        """批量创建用户, 已存在的用户会被跳过, 返回新创建的用户数量
+
+        Args:
+            users (Iterable[User]): 要创建的用户
+        """
+        return await self.call_api("create_users", users=list(users))
+
+    async def create_channels(self, channels: Iterable["Channel"]) -> int:
+        """批量创建频道, 已存在的频道会被跳过, 返回新创建的频道数量
+
+        Args:
+            channels (Iterable[Channel]): 要创建的频道
+        """
+        return await self.call_api("create_channels", channels=list(channels))
+
+    async def create_dm(self, user_id: str) -> "Channel":
         """创建私聊频道
 
         Args:
@@ -176,11 +318,41 @@ class Bot(BaseBot):
         """
         return await self.call_api("create_dm", user_id=user_id)
 
+    async def start_profile(
+        self,
+        events: Optional[int] = None,
+        seconds: Optional[float] = None,
+        mode: Literal["cprofile", "sample"] = "cprofile",
+        output: Optional[str] = None,
+    ) -> str:
+        """开始分析接下来的事件处理, 返回结果目录
+
+        Args:
+            events (Optional[int]): 最多分析的事件数量, 为 None 时不限制
+            seconds (Optional[float]): 最长分析时间, 为 None 时不限制
+            mode (Literal["cprofile", "sample"]): `cprofile` 输出 pstats 文件, `sample` 输出 collapsed stack 文件
+            output (Optional[str]): 结果目录, 默认为 `console_profile_dir` 下以开始时间命名的目录
+        """
+        return await self.call_api("start_profile", events=events, seconds=seconds, mode=mode, output=output)
+
+    async def stop_profile(self) -> Optional[str]:
+        """停止当前的性能分析, 返回结果目录; 没有进行中的分析时返回 None
+
+        正在分析的事件处理完成后才会写入结果, 因此可以在事件处理函数中调用
+        """
+        return await self.call_api("stop_profile")
+
     async def handle_event(self, event: Event) -> None:
         """处理收到的事件"""
+        metrics = self.adapter.metrics
+        start = perf_counter() if metrics.enabled else 0.0
         if isinstance(event, MessageEvent):
-            _check_at_me(self, event)
-            _check_nickname(self, event)
-            if not self.adapter.console_config.console_strict_tome:
+            _check_to_me(self, event)
+            if not self.strict_tome:
                 event.to_me = True
-        await handle_event(self, event)
+        if (profiler := self.adapter.profiler) is not None and profiler.active:
+            await profiler.run(event, handle_event(self, event))
+        else:
+            await handle_event(self, event)
+        if metrics.enabled:
+            metrics.observe("handle_event", perf_counter() - start)
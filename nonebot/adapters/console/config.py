@@ -1,8 +1,46 @@
+from pathlib import Path
+from datetime import datetime
+from typing import Union, Literal, Optional
+
 from pydantic import BaseModel
 
 
+class ConsoleBotConfig(BaseModel):
+    id: str
+    name: str = "Bot"
+    strict_tome: Optional[bool] = None
+    """是否严格判断 to_me, 默认使用 `console_strict_tome`"""
+
+
 class Config(BaseModel):
     console_headless_mode: bool = False
+    console_simulation: bool = False
+    console_simulation_start: Optional[datetime] = None
     console_bot_id: str = "robot"
     console_bot_name: str = "Bot"
     console_strict_tome: bool = False
+    console_bots: list[ConsoleBotConfig] = []
+    console_dispatch_concurrency: int = 64
+    console_dispatch_queue_size: int = 4096
+    console_dispatch_overflow: Literal["block", "drop_oldest", "drop_newest"] = "block"
+    console_dispatch_ordered: bool = True
+    console_dispatch_shutdown_timeout: float = 10.0
+    console_send_batch_window: float = 0.0
+    console_send_batch_size: int = 64
+    console_stream_fps: float = 20.0
+    console_message_cache_size: int = 256
+    console_message_store: Literal["memory", "sqlite"] = "memory"
+    console_message_store_path: Path = Path("console_messages.db")
+    console_message_retention: int = 500
+    console_metrics: bool = False
+    console_metrics_file: Optional[Path] = None
+    console_metrics_format: Literal["prometheus", "json"] = "prometheus"
+    console_metrics_interval: float = 10.0
+    console_remote: Optional[str] = None
+    console_record_file: Optional[Path] = None
+    console_profile_dir: Path = Path("console_profiles")
+    console_reload: bool = False
+    console_reload_interval: float = 0.2
+    console_log_buffer_size: int = 1000
+    console_log_flush_rate: float = 10.0
+    console_log_level: Optional[Union[int, str]] = None
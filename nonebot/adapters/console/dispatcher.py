@@ -0,0 +1,201 @@
+import asyncio
+from itertools import count
+from collections import deque
+from typing import TYPE_CHECKING, Literal, Optional
+
+from .utils import log
+from .event import Event
+
+if TYPE_CHECKING:
+    from .bot import Bot
+
+OverflowPolicy = Literal["block", "drop_oldest", "drop_newest"]
+
+
+class EventDispatcher:
+    """有界的事件派发器
+
+    事件按 `Event.get_session_id()` 分组, 同一会话内的事件按到达顺序依次处理,
+    不同会话之间最多同时处理 `concurrency` 个事件。
+    `ordered` 为 False 时不再按会话排序, 每个事件都独立调度。
+
+    按会话排序时, 在处理函数内等待同一会话下一条消息 (如 `nonebot-plugin-waiter`) 会一直阻塞,
+    直到超时, 因为下一条消息要等当前事件处理完成后才会开始处理。
+
+    等待处理的事件总数达到 `maxsize` 时根据 `overflow` 处理新事件:
+
+    - `block`: 等待队列出现空位
+    - `drop_oldest`: 丢弃最早到达且尚未开始处理的事件
+    - `drop_newest`: 丢弃新到达的事件
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 64,
+        maxsize: int = 4096,
+        overflow: OverflowPolicy = "block",
+        ordered: bool = True,
+    ):
+        self.concurrency = max(concurrency, 1)
+        self.maxsize = max(maxsize, 1)
+        self.overflow: OverflowPolicy = overflow
+        self.ordered = ordered
+        self.dropped = 0
+        """因队列已满被丢弃的事件数量"""
+
+        self._ids = count()
+        # dict 保持插入顺序, 第一个元素即为最早到达的事件
+        self._pending: dict[int, tuple[str, Bot, Event]] = {}
+        self._sessions: dict[str, deque[int]] = {}
+        self._scheduled: set[str] = set()
+        self._active: set[str] = set()
+        self._ready: Optional[asyncio.Queue[str]] = None
+        self._idle: Optional[asyncio.Event] = None
+        self._putters: deque[asyncio.Future] = deque()
+        self._workers: set[asyncio.Task] = set()
+        self._closed = False
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    @property
+    def active(self) -> int:
+        """正在处理的事件数量"""
+        return len(self._active)
+
+    @property
+    def tasks(self) -> set[asyncio.Task]:
+        """存活的工作任务"""
+        return set(self._workers)
+
+    def _ensure_workers(self) -> asyncio.Queue[str]:
+        # 延迟到事件循环中创建, 兼容 Python 3.9 下 Queue 绑定事件循环的行为
+        if self._ready is None:
+            self._ready = asyncio.Queue()
+            self._idle = asyncio.Event()
+            self._idle.set()
+        while len(self._workers) < self.concurrency:
+            task = asyncio.create_task(self._worker(self._ready))
+            self._workers.add(task)
+            task.add_done_callback(self._workers.discard)
+        return self._ready
+
+    def _schedule(self, session_id: str) -> None:
+        if session_id not in self._scheduled and session_id not in self._active:
+            self._scheduled.add(session_id)
+            self._ready.put_nowait(session_id)  # type: ignore
+
+    def _check_idle(self) -> None:
+        if not self._pending and not self._active and self._idle is not None:
+            self._idle.set()
+
+    def _wakeup_putter(self) -> None:
+        while self._putters:
+            fut = self._putters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+
+    def _drop_oldest(self) -> None:
+        # 最早到达的事件必然位于所在会话队列的队首
+        entry_id = next(iter(self._pending))
+        session_id, _, event = self._pending.pop(entry_id)
+        queue = self._sessions[session_id]
+        queue.popleft()
+        if not queue:
+            del self._sessions[session_id]
+        self.dropped += 1
+        log("WARNING", f"Dispatch queue is full, dropped event {event.get_event_name()} of session {session_id}")
+
+    async def put(self, bot: "Bot", event: Event) -> bool:
+        """提交一个待处理事件
+
+        Returns:
+            bool: 事件是否被接受
+        """
+        if self._closed:
+            return False
+        self._ensure_workers()
+        while len(self._pending) >= self.maxsize:
+            if self.overflow == "drop_newest":
+                self.dropped += 1
+                log("WARNING", f"Dispatch queue is full, dropped event {event.get_event_name()}")
+                return False
+            if self.overflow == "drop_oldest":
+                self._drop_oldest()
+                break
+            fut = asyncio.get_running_loop().create_future()
+            self._putters.append(fut)
+            try:
+                await fut
+            except asyncio.CancelledError:
+                fut.cancel()
+                if len(self._pending) < self.maxsize:
+                    self._wakeup_putter()
+                raise
+            if self._closed:
+                return False
+
+        entry_id = next(self._ids)
+        session_id = event.get_session_id()
+        if not self.ordered:
+            # 为每个事件分配独立的队列, 使其可以与同会话的其他事件并发处理
+            session_id = f"{session_id}#{entry_id}"
+        self._pending[entry_id] = (session_id, bot, event)
+        self._idle.clear()  # type: ignore
+        if session_id not in self._sessions:
+            self._sessions[session_id] = deque()
+        self._sessions[session_id].append(entry_id)
+        self._schedule(session_id)
+        return True
+
+    async def _worker(self, ready: asyncio.Queue[str]) -> None:
+        while True:
+            session_id = await ready.get()
+            self._scheduled.discard(session_id)
+            queue = self._sessions.get(session_id)
+            if not queue:
+                # 该会话的事件已被全部丢弃
+                self._check_idle()
+                continue
+            _, bot, event = self._pending.pop(queue.popleft())
+            if not queue:
+                del self._sessions[session_id]
+            self._active.add(session_id)
+            self._wakeup_putter()
+            try:
+                await bot.handle_event(event)
+            except Exception as e:
+                log("ERROR", f"Error while handling event {event.get_event_name()} of session {session_id}", e)
+            finally:
+                self._active.discard(session_id)
+                if session_id in self._sessions:
+                    self._schedule(session_id)
+                self._check_idle()
+
+    async def join(self) -> None:
+        """等待所有已提交的事件处理完成"""
+        if self._idle is not None:
+            await self._idle.wait()
+
+    async def shutdown(self, timeout: Optional[float] = None) -> None:
+        """停止接受新事件, 等待剩余事件处理完成后关闭所有工作任务
+
+        Args:
+            timeout (Optional[float]): 等待的最长时间, 超时后取消未完成的处理任务
+        """
+        self._closed = True
+        while self._putters:
+            fut = self._putters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+        try:
+            await asyncio.wait_for(self.join(), timeout)
+        except asyncio.TimeoutError:
+            log("WARNING", f"Cancelled {len(self._active) + len(self._pending)} unfinished event(s) on shutdown")
+        workers = set(self._workers)
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._pending.clear()
+        self._sessions.clear()
@@ -1,16 +1,66 @@
-from copy import deepcopy
 from datetime import datetime
-from typing import Any, Literal
 from typing_extensions import override
+from typing import TYPE_CHECKING, Any, Literal, Optional
 
-from pydantic import Field, BaseModel
-from nonechat.model import DIRECT, User, Channel
+from nonebot.exception import NoLogException
+from pydantic import Field, BaseModel, PrivateAttr
 from nonebot.utils import DataclassEncoder, escape_tag
-from nonebot.compat import PYDANTIC_V2, ConfigDict, model_dump, model_validator, type_validate_python
+from nonebot.compat import PYDANTIC_V2, ConfigDict, model_validator, custom_validation
 
 from nonebot.adapters import Event as BaseEvent
 
 from .message import Message
+from .utils import truncate, log_enabled
+
+if TYPE_CHECKING:
+    from nonechat.model import User, Channel
+    from nonechat.model import MessageEvent as ConsoleMessageEvent
+
+DESCRIPTION_LENGTH = 200
+"""事件描述中消息内容的最大长度"""
+
+DIRECT_ID = "_direct"
+"""nonechat 默认私聊频道的 ID"""
+
+
+def _is_private(channel: "Channel") -> bool:
+    return channel.id == DIRECT_ID or channel.id.startswith("private:")
+
+
+def _nonechat_model(name: str) -> Any:
+    """nonechat 数据类的字段类型
+
+    nonechat 的模型会导入 Textual, 因此只在首次校验时导入; 字典按数据类的字段还原。
+    """
+
+    def validate(value: Any) -> Any:
+        from nonechat import model
+
+        model_cls = getattr(model, name)
+        if isinstance(value, model_cls):
+            return value
+        if isinstance(value, dict):
+            data = dict(value)
+            created_at = data.pop("_created_at", None)
+            result = model_cls(**data)
+            if created_at is not None:
+                result._created_at = created_at
+            return result
+        raise ValueError(f"{name} expected, got {type(value).__name__}")
+
+    @custom_validation
+    class NonechatModel:
+        @classmethod
+        def __get_validators__(cls):
+            yield validate
+
+    NonechatModel.__name__ = NonechatModel.__qualname__ = name
+    return NonechatModel
+
+
+if not TYPE_CHECKING:
+    User = _nonechat_model("User")
+    Channel = _nonechat_model("Channel")
 
 
 class MessageResponse(BaseModel):
@@ -42,9 +92,24 @@ class Event(BaseEvent):
     def get_event_name(self) -> str:
         return self.post_type
 
+    _description: Optional[str] = PrivateAttr(default=None)
+
+    @override
+    def get_log_string(self) -> str:
+        # NoneBot 总是先构造日志内容再交给 logger, 日志不会被输出时直接跳过构造
+        if not log_enabled("SUCCESS"):
+            raise NoLogException("Console")
+        return super().get_log_string()
+
     @override
     def get_event_description(self) -> str:
-        return escape_tag(str(model_dump(self)))
+        """事件描述, 首次生成后缓存在事件上"""
+        if self._description is None:
+            self._description = self._describe()
+        return self._description
+
+    def _describe(self) -> str:
+        return escape_tag(f"{self.post_type} from {self.user.nickname}({self.user.id}) @ {self.channel.name}")
 
     @override
     def get_message(self) -> Message:
@@ -56,6 +121,8 @@ class Event(BaseEvent):
 
     @override
     def get_session_id(self) -> str:
+        from nonechat.model import DIRECT
+
         if self.channel == DIRECT:
             return self.user.id
         return f"{self.channel.id}_{self.user.id}"
@@ -73,16 +140,32 @@ class MessageEvent(Event):
     to_me: bool = False
 
     original_message: Message = Field(init=False, default_factory=Message)
+    """原始消息, 与 `message` 共享消息段对象"""
 
     @model_validator(mode="after")
     @classmethod
     def _check_message(cls, data) -> Any:
+        # 仅复制消息段列表, 适配器对 message 的修改总是替换消息段而非原地修改
         if isinstance(data, dict):
-            data["original_message"] = deepcopy(data["message"])
+            data["original_message"] = Message(data["message"])
         else:
-            data.original_message = deepcopy(data.message)
+            data.original_message = Message(data.message)
         return data
 
+    @classmethod
+    def from_console_event(cls, event: "ConsoleMessageEvent") -> "MessageEvent":
+        """从 nonechat 消息事件直接创建私聊或频道消息事件"""
+        event_cls = PrivateMessageEvent if _is_private(event.channel) else PublicMessageEvent
+        return event_cls(
+            time=event.time,
+            self_id=event.self_id,
+            user=event.user,
+            post_type="message",
+            message_id=event.message_id,
+            message=Message.from_console_message(event.message),
+            channel=event.channel,
+        )
+
     @override
     def get_message(self) -> Message:
         return self.message
@@ -92,24 +175,35 @@ class MessageEvent(Event):
         return self.to_me
 
     @override
-    def get_event_description(self) -> str:
+    def _describe(self) -> str:
         texts: list[str] = []
         msg_string: list[str] = []
+        remaining = DESCRIPTION_LENGTH
+        # 只转换描述长度以内的消息段
         for seg in self.message:
+            text = str(seg)
+            if len(text) > remaining:
+                text = truncate(text, max(remaining, 3))
+                remaining = 0
+            else:
+                remaining -= len(text)
             if seg.is_text():
-                texts.append(str(seg))
+                texts.append(text)
             else:
-                msg_string.extend((escape_tag("".join(texts)), f"<le>{escape_tag(str(seg))}</le>"))
+                msg_string.extend((escape_tag("".join(texts)), f"<le>{escape_tag(text)}</le>"))
                 texts.clear()
+            if not remaining:
+                break
         msg_string.append(escape_tag("".join(texts)))
-        if self.channel.id == DIRECT.id or self.channel.id.startswith("private:"):
+        if _is_private(self.channel):
             return f"Message from {self.user.nickname}({self.user.id}): {''.join(msg_string)!r}"
         return f"Message from {self.user.nickname}({self.user.id}) @ {self.channel.name}: {''.join(msg_string)!r}"
 
-    def convert(self):
-        if self.channel.id == DIRECT.id or self.channel.id.startswith("private:"):
-            return type_validate_python(PrivateMessageEvent, model_dump(self))
-        return type_validate_python(PublicMessageEvent, model_dump(self))
+    def convert(self) -> "MessageEvent":
+        event_cls = PrivateMessageEvent if _is_private(self.channel) else PublicMessageEvent
+        if isinstance(self, event_cls):
+            return self
+        return event_cls(**dict(self))
 
 
 class PrivateMessageEvent(MessageEvent):
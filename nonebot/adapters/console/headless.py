@@ -0,0 +1,164 @@
+import asyncio
+from datetime import datetime
+from secrets import token_hex
+from dataclasses import dataclass
+from collections.abc import Iterable
+from typing_extensions import TypeVar
+from typing import TYPE_CHECKING, Union, Generic, Optional
+
+from .simulation import VirtualClock
+
+if TYPE_CHECKING:
+    from nonechat.message import ConsoleMessage
+    from nonechat.setting import ConsoleSetting
+    from nonechat.model import User, Event, Robot, Channel, MessageEvent
+
+    from .backend import AdapterConsoleBackend
+
+TB = TypeVar("TB", bound="AdapterConsoleBackend", default="AdapterConsoleBackend")
+
+
+@dataclass
+class HeadlessSetting:
+    """无界面前端的设置, 只包含后端创建默认用户与机器人所需的字段
+
+    `nonechat.setting.ConsoleSetting` 依赖 Textual, 无界面前端不使用它。
+    """
+
+    user_avatar: str = "👤"
+    user_name: str = "User"
+    bot_avatar: str = "🤖"
+    bot_name: str = "Bot"
+
+
+class HeadlessFrontend(Generic[TB]):
+    """无界面的 Console 前端
+
+    提供与 `nonechat.Frontend` 相同的消息接口, 但不启动 Textual 应用,
+    所有用户、频道与聊天记录均保存在后端的内存存储中。
+    """
+
+    def __init__(self, backend: type[TB], setting: Union["ConsoleSetting", HeadlessSetting, None] = None):
+        self.setting = setting or HeadlessSetting()
+        self.is_bot_mode = False
+        self.backend: TB = backend(self)  # type: ignore
+        self.clock: Optional[VirtualClock] = None
+        """虚拟时钟, 设置后事件时间由虚拟时钟提供"""
+
+    def now(self) -> datetime:
+        """当前时间, 模拟模式下为虚拟时间"""
+        return datetime.now() if self.clock is None else self.clock.now()
+
+    async def run_async(self) -> None:
+        """注册默认的用户、频道与机器人"""
+        await self.backend.add_user(self.backend.current_user)
+        await self.backend.add_channel(self.backend.current_channel)
+        await self.backend.add_bot(self.backend.current_bot)
+
+    def exit(self) -> None:
+        pass
+
+    def notify(self, message: str, *, title: str = "", timeout: Optional[float] = None) -> None:
+        pass
+
+    async def send_message(
+        self,
+        content: "ConsoleMessage",
+        channel: Union["Channel", None] = None,
+        bot: Union["Robot", None] = None,
+    ) -> str:
+        """发送消息到当前频道或指定频道"""
+        from nonechat.model import MessageEvent
+
+        target = channel or self.backend.current_channel
+        msg = MessageEvent(
+            time=self.now(),
+            self_id=(bot or self.backend.current_bot).id,
+            type="console.message",
+            user=(bot or self.backend.current_bot),
+            message_id="_unset_",
+            message=content,
+            channel=target,
+        )
+        return await self.backend.write_chat(msg, target)
+
+    async def receive_message(self, message: "MessageEvent") -> str:
+        """接收消息"""
+        await self.backend.add_user(message.user)
+        await self.backend.add_channel(message.channel)
+        return await self.backend.write_chat(message, message.channel)
+
+    async def recall_message(self, message_id: str, channel: Union["Channel", None] = None):
+        """撤回消息"""
+        return await self.backend.remove_chat(message_id, channel or self.backend.current_channel)
+
+    async def edit_message(self, message_id: str, content: "ConsoleMessage", channel: Union["Channel", None] = None):
+        """编辑消息"""
+        return await self.backend.edit_chat(message_id, content, channel or self.backend.current_channel)
+
+    async def toggle_bell(self) -> None:
+        pass
+
+    def create_message_event(
+        self,
+        content: Union[str, "ConsoleMessage"],
+        user: Optional["User"] = None,
+        channel: Optional["Channel"] = None,
+        time: Optional[datetime] = None,
+        bot: Optional["Robot"] = None,
+    ) -> "MessageEvent":
+        """构造一个发往机器人的消息事件
+
+        Args:
+            content (Union[str, ConsoleMessage]): 消息内容
+            user (Optional[User]): 发送者, 默认为当前用户
+            channel (Optional[Channel]): 所在频道, 默认为当前频道
+            time (Optional[datetime]): 事件时间, 默认为当前时间, 模拟模式下为虚拟时间
+            bot (Optional[Robot]): 接收事件的机器人, 默认为当前机器人
+        """
+        from nonechat.model import MessageEvent
+        from nonechat.message import Text, ConsoleMessage
+
+        return MessageEvent(
+            time=time or self.now(),
+            self_id=(bot or self.backend.current_bot).id,
+            type="console.message",
+            user=user or self.backend.current_user,
+            message_id=token_hex(8),
+            message=ConsoleMessage([Text(content)]) if isinstance(content, str) else content,
+            channel=channel or self.backend.current_channel,
+        )
+
+    async def post_event(self, event: "Event", record: bool = True) -> None:
+        """注入单个事件
+
+        Args:
+            event (Event): 要注入的事件
+            record (bool): 是否将消息事件写入聊天记录, 以便 `get_msg` 等接口查询
+        """
+        from nonechat.model import MessageEvent
+
+        if record and isinstance(event, MessageEvent):
+            await self.receive_message(event)
+        await self.backend.post_event(event)
+
+    async def post_events(self, events: Iterable["Event"], record: bool = True, chunk_size: int = 1024) -> int:
+        """批量注入事件
+
+        每注入 `chunk_size` 个事件后让出一次事件循环, 使已派发的处理任务得以推进。
+
+        Args:
+            events (Iterable[Event]): 要注入的事件
+            record (bool): 是否将消息事件写入聊天记录
+            chunk_size (int): 每批事件的数量
+
+        Returns:
+            int: 注入的事件数量
+        """
+        count = 0
+        for event in events:
+            await self.post_event(event, record)
+            count += 1
+            if count % chunk_size == 0:
+                await asyncio.sleep(0)
+        return count
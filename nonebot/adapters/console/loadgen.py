@@ -0,0 +1,206 @@
+"""多进程分片压测
+
+启动多个工作进程, 每个进程运行独立的 NoneBot 驱动器与 headless Console 适配器,
+合成的用户与频道按会话 ID 分配到各进程, 测试结束后通过管道汇总吞吐量与耗时统计。
+
+用法: python -m nonebot.adapters.console.loadgen --workers 4 --events 10000 --plugin my_plugin
+"""
+
+import sys
+import json
+import zlib
+import asyncio
+import argparse
+import contextlib
+import multiprocessing
+from time import perf_counter
+from typing import Any, Optional
+from dataclasses import field, dataclass
+from multiprocessing.connection import Connection
+
+from .metrics import Histogram
+
+
+@dataclass
+class LoadOptions:
+    """压测参数"""
+
+    workers: int = 2
+    """工作进程数量"""
+    users: int = 100
+    """合成用户数量"""
+    channels: int = 10
+    """合成频道数量"""
+    events: int = 10000
+    """所有进程注入的事件总数"""
+    message: str = "hello"
+    """消息内容"""
+    record: bool = False
+    """是否将消息写入聊天记录"""
+    plugins: list[str] = field(default_factory=list)
+    """各进程加载的插件"""
+    config: dict[str, Any] = field(default_factory=dict)
+    """传递给 `nonebot.init` 的额外配置"""
+
+
+def session_id(user_id: str, channel_id: str) -> str:
+    """与 `Event.get_session_id` 一致的会话 ID"""
+    return f"{channel_id}_{user_id}"
+
+
+def shard_of(session: str, workers: int) -> int:
+    """会话所属的工作进程, 与进程的哈希种子无关"""
+    return zlib.crc32(session.encode()) % workers
+
+
+def make_shards(options: LoadOptions) -> list[list[tuple[str, str]]]:
+    """将所有 `(用户, 频道)` 会话分配到各工作进程"""
+    shards: list[list[tuple[str, str]]] = [[] for _ in range(options.workers)]
+    for c in range(options.channels):
+        for u in range(options.users):
+            user_id, channel_id = f"user{u}", f"channel{c}"
+            shards[shard_of(session_id(user_id, channel_id), options.workers)].append((user_id, channel_id))
+    return shards
+
+
+async def _run_worker(conn: Connection, options: LoadOptions, sessions: list[tuple[str, str]], events: int):
+    from nonechat.model import User, Channel
+
+    import nonebot
+
+    config = {"driver": "~none", "log_level": "WARNING", **options.config}
+    config.pop("console_headless_mode", None)
+    config.pop("console_metrics", None)
+    nonebot.init(**config, console_headless_mode=True, console_metrics=True)
+    from nonebot.adapters.console import Adapter
+
+    driver = nonebot.get_driver()
+    driver.register_adapter(Adapter)
+    for plugin in options.plugins:
+        nonebot.load_plugin(plugin)
+    await driver._lifespan.startup()
+    adapter = nonebot.get_adapter(Adapter)
+    frontend = adapter.frontend
+
+    users = {user_id: User(user_id, nickname=user_id) for user_id, _ in sessions}
+    channels = {channel_id: Channel(channel_id, channel_id) for _, channel_id in sessions}
+    batch = [
+        frontend.create_message_event(options.message, users[user_id], channels[channel_id])
+        for user_id, channel_id in (sessions[i % len(sessions)] for i in range(events if sessions else 0))
+    ]
+
+    conn.send("ready")
+    conn.recv()
+    start = perf_counter()
+    await adapter.inject_events(batch, options.record)
+    await adapter.dispatcher.join()
+    elapsed = perf_counter() - start
+
+    conn.send(
+        {
+            "sessions": len(sessions),
+            "events": len(batch),
+            "elapsed": elapsed,
+            "dropped": adapter.dispatcher.dropped,
+            "stages": adapter.metrics.stages,
+        }
+    )
+    await driver._lifespan.shutdown()
+
+
+def _worker(conn: Connection, options: LoadOptions, sessions: list[tuple[str, str]], events: int) -> None:
+    try:
+        asyncio.run(_run_worker(conn, options, sessions, events))
+    except BaseException as e:
+        # 异常本身不一定能够序列化
+        with contextlib.suppress(OSError):
+            conn.send(RuntimeError(f"{type(e).__name__}: {e}"))
+        raise
+    finally:
+        conn.close()
+
+
+def _recv(conn: Connection) -> Any:
+    result = conn.recv()
+    if isinstance(result, BaseException):
+        raise RuntimeError("Load generator worker failed") from result
+    return result
+
+
+def run_load(options: LoadOptions) -> dict[str, Any]:
+    """启动工作进程执行压测, 返回汇总的统计结果
+
+    所有进程完成初始化后才同时开始注入事件, 启动耗时不计入统计。
+    每个进程注入的事件数与分配到的会话数成正比。
+    """
+    ctx = multiprocessing.get_context("spawn")
+    shards = make_shards(options)
+    total_sessions = sum(len(shard) for shard in shards) or 1
+    workers: list[tuple[multiprocessing.process.BaseProcess, Connection]] = []
+    for sessions in shards:
+        parent, child = ctx.Pipe()
+        events = options.events * len(sessions) // total_sessions
+        process = ctx.Process(target=_worker, args=(child, options, sessions, events), daemon=True)
+        process.start()
+        child.close()
+        workers.append((process, parent))
+
+    try:
+        for _, conn in workers:
+            _recv(conn)
+        for _, conn in workers:
+            conn.send("go")
+        results = [_recv(conn) for _, conn in workers]
+    finally:
+        for process, conn in workers:
+            conn.close()
+            process.join()
+
+    stages: dict[str, Histogram] = {}
+    for result in results:
+        for stage, hist in result.pop("stages").items():
+            if stage in stages:
+                stages[stage].merge(hist)
+            else:
+                stages[stage] = hist
+    events = sum(result["events"] for result in results)
+    elapsed = max((result["elapsed"] for result in results), default=0.0)
+    return {
+        "workers": options.workers,
+        "events": events,
+        "elapsed": elapsed,
+        "per_second": events / elapsed if elapsed else 0.0,
+        "dropped": sum(result["dropped"] for result in results),
+        "stages": {stage: hist.snapshot() for stage, hist in stages.items()},
+        "per_worker": results,
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(), help="工作进程数量")
+    parser.add_argument("--users", type=int, default=100, help="合成用户数量")
+    parser.add_argument("--channels", type=int, default=10, help="合成频道数量")
+    parser.add_argument("--events", type=int, default=10000, help="注入的事件总数")
+    parser.add_argument("--message", default="hello", help="消息内容")
+    parser.add_argument("--record", action="store_true", help="将消息写入聊天记录")
+    parser.add_argument("--plugin", dest="plugins", action="append", default=[], help="要加载的插件, 可重复指定")
+    parser.add_argument("--output", default="-", help="结果 JSON 文件, 默认输出到标准输出")
+    options = vars(parser.parse_args(argv))
+    output = options.pop("output")
+    report = run_load(LoadOptions(**options))
+    print(
+        f"{report['events']} events on {report['workers']} workers in {report['elapsed']:.2f}s "
+        f"({report['per_second']:.0f}/s)",
+        file=sys.stderr,
+    )
+    if output == "-":
+        print(json.dumps(report, indent=2))
+    else:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+from collections import deque
+from typing import TYPE_CHECKING, Any, Optional
+
+if TYPE_CHECKING:
+    from nonechat.log_redirect import LogStorage
+
+
+class BufferedLogSink:
+    """写入环形缓冲区的 loguru sink
+
+    `write` 只将日志追加到容量为 `capacity` 的缓冲区, 不触碰前端;
+    缓冲区由前端在刷新周期中调用 `drain` 批量写入日志视图。
+    缓冲区已满时丢弃最早的日志, 低于 `levelno` 的日志直接忽略。
+    """
+
+    def __init__(self, storage: "LogStorage", capacity: int = 1000, levelno: int = 0):
+        self.storage = storage
+        self.levelno = levelno
+        self.dropped = 0
+        """因缓冲区已满被丢弃的日志数量"""
+        self.filtered = 0
+        """因日志等级过低被忽略的日志数量"""
+        self._buffer: deque[str] = deque(maxlen=max(capacity, 1))
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def write(self, message: Any) -> None:
+        # loguru 传入的消息为带有 `record` 属性的 str
+        if (record := getattr(message, "record", None)) is not None and record["level"].no < self.levelno:
+            self.filtered += 1
+            return
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append(message)
+
+    def drain(self) -> int:
+        """将缓冲区中的日志一次性写入日志视图, 返回写入的数量"""
+        if not self._buffer:
+            return 0
+        from rich.text import Text
+
+        messages: list[str] = []
+        # 其他线程可能同时写入, 逐条弹出而不是复制后清空
+        try:
+            while True:
+                messages.append(self._buffer.popleft())
+        except IndexError:
+            pass
+        # 一次 write_log 只触发一次日志视图刷新
+        self.storage.write_log(*(Text.from_ansi(message, end="", tab_size=4) for message in messages))
+        return len(messages)
+
+    def stop(self) -> None:
+        self.drain()
+
+    def tasks_to_complete(self) -> list:
+        return []
+
+    def info(self) -> dict[str, Optional[int]]:
+        return {
+            "buffered": len(self._buffer),
+            "capacity": self._buffer.maxlen,
+            "dropped": self.dropped,
+            "filtered": self.filtered,
+        }
@@ -1,17 +1,18 @@
-from dataclasses import asdict
+import sys
 from collections.abc import Iterable
 from typing_extensions import Self, override
-from typing import TYPE_CHECKING, Union, Optional
-
-from rich.style import Style
-from rich.emoji import EmojiVariant
-from rich.console import JustifyMethod
-from nonechat import Text, Emoji, Markup, Markdown, ConsoleMessage
+from typing import TYPE_CHECKING, Any, Union, Callable, ClassVar, Optional
 
 from nonebot.adapters import Message as BaseMessage
 from nonebot.adapters import MessageSegment as BaseMessageSegment
 
-from .utils import truncate
+from .utils import LRUCache, truncate
+
+if TYPE_CHECKING:
+    from rich.style import Style
+    from rich.emoji import EmojiVariant
+    from rich.console import JustifyMethod
+    from nonechat.message import Text, Emoji, Element, ConsoleMessage
 
 
 class MessageSegment(BaseMessageSegment["Message"]):
@@ -39,6 +40,11 @@ class MessageSegment(BaseMessageSegment["Message"]):
     def is_text(self) -> bool:
         return self.type == "text"
 
+    @override
+    def copy(self) -> "MessageSegment":
+        # 消息段数据的值均为不可变对象, 复制字典即可, 无需深拷贝
+        return MessageSegment(self.type, self.data.copy())
+
     @staticmethod
     def text(text: str) -> "MessageSegment":
         return MessageSegment("text", {"text": text})
@@ -50,9 +56,9 @@ class MessageSegment(BaseMessageSegment["Message"]):
     @staticmethod
     def markup(
         markup: str,
-        style: Union[str, Style] = "none",
+        style: Union[str, "Style"] = "none",
         emoji: bool = True,
-        emoji_variant: Optional[EmojiVariant] = None,
+        emoji_variant: Optional["EmojiVariant"] = None,
     ) -> "MessageSegment":
         return MessageSegment(
             "markup",
@@ -68,8 +74,8 @@ class MessageSegment(BaseMessageSegment["Message"]):
     def markdown(
         markup: str,
         code_theme: str = "monokai",
-        justify: Optional[JustifyMethod] = None,
-        style: Union[str, Style] = "none",
+        justify: Optional["JustifyMethod"] = None,
+        style: Union[str, "Style"] = "none",
         hyperlinks: bool = True,
         inline_code_lexer: Optional[str] = None,
         inline_code_theme: Optional[str] = None,
@@ -98,46 +104,137 @@ class Message(BaseMessage[MessageSegment]):
 
     @override
     def __add__(self, other: Union[str, MessageSegment, Iterable[MessageSegment]]) -> Self:
-        return super().__add__(MessageSegment.text(other) if isinstance(other, str) else other)
+        result = self.copy()
+        result += other
+        return result
 
     @override
     def __radd__(self, other: Union[str, MessageSegment, Iterable[MessageSegment]]) -> Self:
-        return super().__radd__(MessageSegment.text(other) if isinstance(other, str) else other)
+        result = self.__class__(other)
+        result += self
+        return result
 
     @override
     def __iadd__(self, other: Union[str, MessageSegment, Iterable[MessageSegment]]) -> Self:
-        return super().__iadd__(MessageSegment.text(other) if isinstance(other, str) else other)
+        if isinstance(other, str):
+            list.append(self, MessageSegment.text(other))
+            return self
+        if isinstance(other, MessageSegment):
+            list.append(self, other)
+            return self
+        return super().__iadd__(other)
+
+    @override
+    def copy(self) -> Self:
+        """复制消息, 各消息段均为新对象"""
+        msg = self.__class__()
+        list.extend(msg, [seg.copy() for seg in self])
+        return msg
 
     @staticmethod
     @override
     def _construct(msg: str) -> Iterable[MessageSegment]:
         yield MessageSegment.text(msg)
 
-    def to_console_message(self) -> ConsoleMessage:
-        """将 Message 转换为 ConsoleMessage"""
-        elements = []
-        for seg in self:
-            if seg.type == "text":
-                elements.append(Text(seg.data["text"]))
-            elif seg.type == "emoji":
-                elements.append(Emoji(seg.data["name"]))
-            elif seg.type == "markdown":
-                elements.append(Markdown(**seg.data))
-            elif seg.type == "markup":
-                elements.append(Markup(**seg.data))
-        return ConsoleMessage(elements)
+    to_console_cache: ClassVar[LRUCache[tuple, tuple["Element", ...]]] = LRUCache()
+    """`to_console_message` 的转换结果缓存, 命中时返回元素的副本"""
+    from_console_cache: ClassVar[LRUCache[tuple, tuple[tuple[str, tuple[tuple[str, Any], ...]], ...]]] = LRUCache()
+    """`from_console_message` 的转换结果缓存, 以不可变的 `(类型, 数据项)` 元组保存消息段"""
+
+    def to_console_message(self) -> "ConsoleMessage":
+        """将 Message 转换为 ConsoleMessage
+
+        每个消息段对应一个元素。每次返回新的 ConsoleMessage 与元素, 调用方可以自由修改。
+        """
+        if not _TO_CONSOLE:
+            _load_elements()
+        if all(seg.type == "text" for seg in self):
+            # 纯文本消息直接构造, 比计算缓存键更快
+            return ConsoleMessage([Text(seg.data["text"]) for seg in self])
+        key = tuple((seg.type, tuple(seg.data.items())) for seg in self)
+        try:
+            if (cached := self.to_console_cache.get(key)) is not None:
+                return ConsoleMessage([_copy_element(elem) for elem in cached])
+        except TypeError:
+            # 消息段数据中包含不可哈希的值
+            return self._to_console_message()
+        result = self._to_console_message()
+        self.to_console_cache.put(key, tuple(_copy_element(elem) for elem in result))
+        return result
+
+    def _to_console_message(self) -> "ConsoleMessage":
+        return ConsoleMessage([factory(**seg.data) for seg in self if (factory := _TO_CONSOLE.get(seg.type))])
+
+    @classmethod
+    def from_console_message(cls, message: "ConsoleMessage") -> "Message":
+        """从 ConsoleMessage 创建 Message
+
+        相同内容的 ConsoleMessage 会复用缓存的转换结果, 返回的消息段与数据字典总是新建的。
+        """
+        if not _FROM_CONSOLE:
+            _load_elements()
+        if len(message) == 1 and type(elem := message[0]) is Text:
+            # 单段纯文本直接构造, 比计算缓存键更快
+            msg = cls()
+            list.append(msg, MessageSegment("text", {"text": elem.text}))
+            return msg
+        key = tuple((type(elem), tuple(vars(elem).values())) for elem in message)
+        try:
+            cached = cls.from_console_cache.get(key)
+        except TypeError:
+            return cls._from_console_message(message)
+        if cached is not None:
+            msg = cls()
+            list.extend(msg, [MessageSegment(type_, dict(items)) for type_, items in cached])
+            return msg
+        msg = cls._from_console_message(message)
+        cls.from_console_cache.put(key, tuple((seg.type, tuple(seg.data.items())) for seg in msg))
+        return msg
 
     @classmethod
-    def from_console_message(cls, message: ConsoleMessage) -> "Message":
-        """从 ConsoleMessage 创建 Message"""
+    def _from_console_message(cls, message: "ConsoleMessage") -> "Message":
         msg = cls()
-        for elem in message:
-            if isinstance(elem, Text):
-                msg += MessageSegment.text(elem.text)
-            elif isinstance(elem, Emoji):
-                msg += MessageSegment.emoji(elem.name)
-            else:
-                if TYPE_CHECKING:
-                    assert isinstance(elem, (Markdown, Markup))
-                msg += MessageSegment(type=elem.__class__.__name__.lower(), data=asdict(elem))  # noqa
+        # 消息段均由转换表构造, 无需再经过 append 的逐个类型检查
+        list.extend(msg, [_FROM_CONSOLE.get(type(elem), _from_element)(elem) for elem in message])
         return msg
+
+
+# 消息段数据的键与对应元素的构造参数一致
+_TO_CONSOLE: dict[str, Callable[..., "Element"]] = {}
+_FROM_CONSOLE: dict[type, Callable[[Any], MessageSegment]] = {}
+
+
+def _load_elements() -> None:
+    """导入 nonechat 的消息元素并填充转换表
+
+    nonechat 的消息元素依赖 Rich, 在首次转换时才导入, 仅使用消息模型时不会加载界面相关的模块。
+    """
+    global Text, Emoji, ConsoleMessage
+    from nonechat.message import Text, Emoji, Markup, Markdown, ConsoleMessage
+
+    _TO_CONSOLE.update(text=Text, emoji=Emoji, markdown=Markdown, markup=Markup)
+    _FROM_CONSOLE.update(
+        {
+            Text: lambda elem: MessageSegment("text", {"text": elem.text}),
+            Emoji: lambda elem: MessageSegment("emoji", {"name": elem.name}),
+            # dataclass 元素的字段均为不可变值, 浅拷贝即可
+            Markdown: lambda elem: MessageSegment("markdown", dict(vars(elem))),
+            Markup: lambda elem: MessageSegment("markup", dict(vars(elem))),
+        }
+    )
+
+
+def _copy_element(elem: "Element") -> "Element":
+    """浅拷贝元素, 元素的属性均为不可变值"""
+    copied = object.__new__(type(elem))
+    copied.__dict__.update(vars(elem))
+    return copied
+
+
+def _from_element(elem: "Element") -> MessageSegment:
+    """转换未在转换表中注册的元素, 以类名作为消息段类型"""
+    if isinstance(elem, Text):
+        return MessageSegment("text", {"text": elem.text})
+    if isinstance(elem, Emoji):
+        return MessageSegment("emoji", {"name": elem.name})
+    return MessageSegment(sys.intern(type(elem).__name__.lower()), dict(vars(elem)))
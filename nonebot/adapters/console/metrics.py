@@ -0,0 +1,204 @@
+import json
+from time import monotonic
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Any, Optional
+
+if TYPE_CHECKING:
+    from .adapter import Adapter
+
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class Histogram:
+    """固定分桶的耗时直方图, 单位为秒"""
+
+    __slots__ = ("buckets", "counts", "count", "sum", "max")
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "Histogram") -> None:
+        """合并另一个分桶相同的直方图"""
+        if other.buckets != self.buckets:
+            raise ValueError("Cannot merge histograms with different buckets")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """估算分位数, 返回所在分桶的上界"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip((*map(str, self.buckets), "+Inf"), self.counts)),
+        }
+
+
+class CallStats:
+    """接口调用统计"""
+
+    __slots__ = ("errors", "latency")
+
+    def __init__(self):
+        self.errors = 0
+        self.latency = Histogram()
+
+    @property
+    def calls(self) -> int:
+        return self.latency.count
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"calls": self.calls, "errors": self.errors, "latency": self.latency.snapshot()}
+
+
+class Metrics:
+    """适配器热路径的耗时与吞吐统计
+
+    记录以下阶段的耗时:
+
+    - `post_event`: 后端收到事件到事件进入派发队列
+    - `convert`: 将 nonechat 消息事件转换为适配器事件
+    - `handle_event`: `Bot.handle_event` 处理单个事件
+    - `send`: 发送消息到写入聊天记录
+
+    未启用时调用方应跳过计时, 仅需一次属性判断。
+    """
+
+    STAGES = ("post_event", "convert", "handle_event", "send")
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.events = 0
+        """收到的事件数量"""
+        self.stages: dict[str, Histogram] = {stage: Histogram() for stage in self.STAGES}
+        self._started = monotonic()
+        # 按秒统计事件数, 用于计算最近一秒的事件速率
+        self._second = int(self._started)
+        self._second_events = 0
+        self._last_second_events = 0
+
+    def observe(self, stage: str, seconds: float) -> None:
+        self.stages[stage].observe(seconds)
+
+    def count_event(self) -> None:
+        second = int(monotonic())
+        if second != self._second:
+            self._last_second_events = self._second_events if second == self._second + 1 else 0
+            self._second = second
+            self._second_events = 0
+        self._second_events += 1
+        self.events += 1
+
+    @property
+    def recent_event_rate(self) -> int:
+        """上一秒内收到的事件数量"""
+        second = int(monotonic())
+        if second == self._second:
+            return self._last_second_events
+        return self._second_events if second == self._second + 1 else 0
+
+    def snapshot(self, adapter: "Adapter") -> dict[str, Any]:
+        """获取当前统计的快照"""
+        uptime = monotonic() - self._started
+        log_sink = adapter.frontend.backend.log_sink if getattr(adapter, "_frontend", None) else None
+        return {
+            "uptime": uptime,
+            "events": self.events,
+            "event_rate": self.events / uptime if uptime > 0 else 0.0,
+            "event_rate_recent": self.recent_event_rate,
+            "inflight": adapter.dispatcher.active,
+            "queued": len(adapter.dispatcher),
+            "dropped": adapter.dispatcher.dropped,
+            "unknown_bot_events": adapter.unknown_bot_events,
+            "outgoing_queued": len(adapter.outgoing),
+            "log_dropped": log_sink.dropped if log_sink else 0,
+            "stages": {stage: hist.snapshot() for stage, hist in self.stages.items()},
+            "apis": {api: stats.snapshot() for api, stats in adapter.api_stats.items()},
+        }
+
+    def to_json(self, adapter: "Adapter") -> str:
+        return json.dumps(self.snapshot(adapter), ensure_ascii=False)
+
+    def to_prometheus(self, adapter: "Adapter") -> str:
+        """以 Prometheus 文本格式导出统计"""
+        snapshot = self.snapshot(adapter)
+        lines: list[str] = []
+
+        def metric(name: str, kind: str, value: float) -> None:
+            lines.extend((f"# TYPE {_PREFIX}{name} {kind}", f"{_PREFIX}{name} {value}"))
+
+        metric("events_total", "counter", snapshot["events"])
+        metric("event_rate", "gauge", snapshot["event_rate_recent"])
+        metric("inflight_handlers", "gauge", snapshot["inflight"])
+        metric("queued_events", "gauge", snapshot["queued"])
+        metric("dropped_events_total", "counter", snapshot["dropped"])
+        metric("unknown_bot_events_total", "counter", snapshot["unknown_bot_events"])
+        metric("outgoing_queued", "gauge", snapshot["outgoing_queued"])
+        metric("dropped_logs_total", "counter", snapshot["log_dropped"])
+        lines.append(f"# TYPE {_PREFIX}stage_seconds histogram")
+        for stage, hist in self.stages.items():
+            lines.extend(_render_histogram(f"{_PREFIX}stage_seconds", f'stage="{stage}"', hist))
+        lines.append(f"# TYPE {_PREFIX}api_seconds histogram")
+        for api, stats in adapter.api_stats.items():
+            lines.extend(_render_histogram(f"{_PREFIX}api_seconds", f'api="{api}"', stats.latency))
+        lines.append(f"# TYPE {_PREFIX}api_errors_total counter")
+        lines.extend(
+            f'{_PREFIX}api_errors_total{{api="{api}"}} {stats.errors}' for api, stats in adapter.api_stats.items()
+        )
+        return "\n".join(lines) + "\n"
+
+
+_PREFIX = "nonebot_console_"
+
+
+def _render_histogram(name: str, labels: str, hist: Histogram) -> list[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip((*map(str, hist.buckets), "+Inf"), hist.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.extend((f"{name}_sum{{{labels}}} {hist.sum}", f"{name}_count{{{labels}}} {hist.count}"))
+    return lines
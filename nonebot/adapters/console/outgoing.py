@@ -0,0 +1,107 @@
+import asyncio
+from time import perf_counter
+from collections.abc import Sequence
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from nonechat.message import ConsoleMessage
+    from nonechat.model import Channel, MessageEvent
+
+    from .bot import Bot
+    from .adapter import Adapter
+
+
+class _Batch:
+    __slots__ = ("bot", "channel", "messages", "futures", "timer")
+
+    def __init__(self, bot: "Bot", channel: "Channel"):
+        self.bot = bot
+        self.channel = channel
+        self.messages: list[MessageEvent] = []
+        self.futures: list[asyncio.Future[str]] = []
+        self.timer: Optional[asyncio.Handle] = None
+
+
+class OutgoingQueue:
+    """发送消息队列
+
+    同一机器人发往同一频道的消息会在 `window` 秒内或累计 `max_size` 条后合并,
+    一次性写入聊天记录并只通知前端刷新一次。`window` 为 0 时仅合并同一轮事件循环内的消息。
+    """
+
+    def __init__(self, adapter: "Adapter", window: float = 0.0, max_size: int = 64):
+        self.adapter = adapter
+        self.window = max(window, 0.0)
+        self.max_size = max(max_size, 1)
+        self._batches: dict[tuple[str, str], _Batch] = {}
+
+    def __len__(self) -> int:
+        return sum(len(batch.messages) for batch in self._batches.values())
+
+    def _enqueue(self, bot: "Bot", content: "ConsoleMessage", channel: "Channel") -> asyncio.Future[str]:
+        from nonechat.model import MessageEvent
+
+        loop = asyncio.get_running_loop()
+        key = (bot.self_id, channel.id)
+        if (batch := self._batches.get(key)) is None:
+            batch = self._batches[key] = _Batch(bot, channel)
+            if self.window:
+                batch.timer = loop.call_later(self.window, self._flush, key)
+            else:
+                batch.timer = loop.call_soon(self._flush, key)
+        batch.messages.append(
+            MessageEvent(
+                time=self.adapter.now(),
+                self_id=bot.info.id,
+                type="console.message",
+                user=bot.info,
+                message_id="_unset_",
+                message=content,
+                channel=channel,
+            )
+        )
+        fut = loop.create_future()
+        batch.futures.append(fut)
+        if len(batch.messages) >= self.max_size:
+            self._flush(key)
+        return fut
+
+    def _flush(self, key: tuple[str, str]) -> None:
+        if (batch := self._batches.pop(key, None)) is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        try:
+            message_ids = self.adapter.frontend.backend.write_chats(batch.messages, batch.channel)
+        except Exception as e:
+            for fut in batch.futures:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for fut, message_id in zip(batch.futures, message_ids):
+            if not fut.done():
+                fut.set_result(message_id)
+
+    async def send(self, bot: "Bot", content: "ConsoleMessage", channel: "Channel") -> str:
+        """发送一条消息, 返回消息 ID"""
+        metrics = self.adapter.metrics
+        start = perf_counter() if metrics.enabled else 0.0
+        message_id = await self._enqueue(bot, content, channel)
+        if metrics.enabled:
+            metrics.observe("send", perf_counter() - start)
+        return message_id
+
+    async def send_many(self, bot: "Bot", contents: Sequence["ConsoleMessage"], channel: "Channel") -> list[str]:
+        """按顺序发送多条消息, 返回各消息的 ID"""
+        metrics = self.adapter.metrics
+        start = perf_counter() if metrics.enabled else 0.0
+        futures = [self._enqueue(bot, content, channel) for content in contents]
+        message_ids = list(await asyncio.gather(*futures))
+        if metrics.enabled:
+            metrics.observe("send", perf_counter() - start)
+        return message_ids
+
+    def flush(self) -> None:
+        """立即写入所有等待中的消息"""
+        for key in list(self._batches):
+            self._flush(key)
@@ -0,0 +1,247 @@
+"""按需性能分析
+
+在运行时分析接下来若干个事件或若干秒内 `Bot.handle_event` 触发的全部代码, 结果按事件与会话归类:
+
+- `cprofile`: 使用 cProfile 记录函数调用, 输出 pstats 文件
+- `sample`: 后台线程定时采样事件循环线程的调用栈, 输出可用于生成火焰图的 collapsed stack 文件
+
+分析不会改变事件的并发处理方式:
+
+- `cprofile` 模式同一时间只能启用一个 cProfile, 与正在分析的事件重叠的事件不会单独分析,
+  其开销 (以及等待期间事件循环中其他任务的开销) 会计入正在分析的事件;
+  这些事件同样计入事件数量限制, 并以 `profiled: false` 记录在 `events.json` 中
+- `sample` 模式按采样时事件循环正在运行的任务归属样本, 事件创建的子任务同样归属该事件,
+  事件循环空闲等待 I/O 时的样本会被丢弃。采样线程需要获得 GIL 才能采样,
+  实际分辨率约为 `max(interval, sys.getswitchinterval())`, 默认约 5 毫秒
+"""
+
+import re
+import sys
+import json
+import time
+import pstats
+import asyncio
+import cProfile
+import selectors
+import threading
+import contextvars
+from pathlib import Path
+from types import CodeType
+from collections import Counter
+from collections.abc import Awaitable
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Any, Literal, Callable, Optional
+
+from .utils import log
+
+if TYPE_CHECKING:
+    from .event import Event
+
+ProfileMode = Literal["cprofile", "sample"]
+
+_current_record: contextvars.ContextVar[Optional["ProfiledEvent"]] = contextvars.ContextVar(
+    "_current_record", default=None
+)
+
+
+@dataclass
+class ProfiledEvent:
+    """一个被分析的事件"""
+
+    index: int
+    """事件序号, 从 0 开始"""
+    type: str
+    """事件类型"""
+    session: str
+    """会话 ID"""
+    elapsed: float = 0.0
+    """处理耗时, 单位为秒"""
+    samples: int = 0
+    """采样次数, 仅 `sample` 模式有效"""
+    profiled: bool = True
+    """是否单独分析, `cprofile` 模式下与正在分析的事件重叠的事件为 False"""
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^\w.-]", "_", name) or "_"
+
+
+class Profiler:
+    """一次性能分析
+
+    达到事件数量或时长限制, 或调用 `stop` 后结束, 并将结果写入 `output` 目录:
+
+    - `events.json`: 每个事件的类型、会话、耗时、采样次数以及是否单独分析
+    - `cprofile` 模式: 每个单独分析的事件的 `event-<序号>.prof`, 每个会话的 `session-<会话>.prof` 与汇总的 `all.prof`
+    - `sample` 模式: 每个会话的 `session-<会话>.folded` 与以会话为根帧汇总的 `all.folded`
+
+    Args:
+        output (Path): 结果目录
+        mode (ProfileMode): 分析方式
+        events (Optional[int]): 最多分析的事件数量 (包括未单独分析的重叠事件), 为 None 时不限制
+        seconds (Optional[float]): 最长分析时间, 为 None 时不限制
+        interval (float): `sample` 模式的采样间隔, 单位为秒, 实际分辨率受 `sys.getswitchinterval()` 限制
+    """
+
+    def __init__(
+        self,
+        output: Path,
+        mode: ProfileMode = "cprofile",
+        events: Optional[int] = None,
+        seconds: Optional[float] = None,
+        interval: float = 0.005,
+    ):
+        if mode not in ("cprofile", "sample"):
+            raise ValueError(f"Unknown profile mode: {mode}")
+        self.output = output
+        self.mode = mode
+        self.limit = events
+        self.interval = interval
+        self.events: list[ProfiledEvent] = []
+        self.active = True
+        """是否仍在接受新的事件"""
+        self.done = asyncio.Event()
+        """结果写入完成后设置"""
+        self._running = 0
+        self._profiling = False
+        self._tasks: dict[asyncio.Future, ProfiledEvent] = {}
+        self._stacks: Counter[tuple[str, tuple[str, ...]]] = Counter()
+        self._labels: dict[CodeType, str] = {}
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._sampler: Optional[threading.Thread] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        output.mkdir(parents=True, exist_ok=True)
+        if seconds is not None:
+            self._timer = self._loop.call_later(seconds, self.stop)
+        self._factory: Optional[Callable[..., asyncio.Future]] = None
+        if mode == "sample":
+            self._factory = self._loop.get_task_factory()
+            self._loop.set_task_factory(self._task_factory)
+            self._sampler = threading.Thread(target=self._sample_loop, name="console-profiler", daemon=True)
+            self._sampler.start()
+
+    async def run(self, event: "Event", handler: Awaitable[None]) -> None:
+        """分析一个事件的处理过程, 分析已结束时直接处理"""
+        if not self.active:
+            await handler
+            return
+        record = ProfiledEvent(len(self.events), event.get_event_name(), event.get_session_id())
+        self.events.append(record)
+        if self.limit is not None and len(self.events) >= self.limit:
+            self.active = False
+        self._running += 1
+        profile = None
+        if self.mode == "cprofile" and self._profiling:
+            record.profiled = False
+        elif self.mode == "cprofile":
+            profile = cProfile.Profile()
+            self._profiling = True
+            profile.enable()
+        task = asyncio.current_task()
+        token = _current_record.set(record)
+        if task is not None and self.mode == "sample":
+            self._tasks[task] = record
+        start = time.perf_counter()
+        try:
+            await handler
+        finally:
+            record.elapsed = time.perf_counter() - start
+            if task is not None:
+                self._tasks.pop(task, None)
+            _current_record.reset(token)
+            if profile is not None:
+                profile.disable()
+                self._profiling = False
+                profile.dump_stats(self.output / f"event-{record.index:05d}.prof")
+            self._running -= 1
+            if not self.active and not self._running:
+                self._finish()
+
+    def stop(self) -> None:
+        """停止分析, 正在分析的事件处理完成后写入结果"""
+        self.active = False
+        if not self._running:
+            self._finish()
+
+    def _label(self, code: CodeType) -> str:
+        if (label := self._labels.get(code)) is None:
+            label = self._labels[code] = f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+        return label
+
+    def _task_factory(self, loop: asyncio.AbstractEventLoop, coro: Any, **kwargs: Any) -> asyncio.Future:
+        """在事件处理中创建的子任务归属同一事件"""
+        if self._factory is not None:
+            task = self._factory(loop, coro, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        if (record := _current_record.get()) is not None:
+            self._tasks[task] = record  # type: ignore
+            task.add_done_callback(self._forget)
+        return task
+
+    def _forget(self, task: asyncio.Future) -> None:
+        self._tasks.pop(task, None)  # type: ignore
+
+    def _sample_loop(self) -> None:
+        while self.active or self._running:
+            time.sleep(self.interval)
+            # 事件循环正在执行回调或空闲等待 I/O 时没有当前任务
+            if (task := asyncio.current_task(self._loop)) is None or (record := self._tasks.get(task)) is None:
+                continue
+            if (frame := sys._current_frames().get(self._thread_id)) is None:
+                continue
+            if frame.f_code.co_filename == selectors.__file__:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            record.samples += 1
+            self._stacks[(record.session, tuple(stack))] += 1
+
+    def _finish(self) -> None:
+        if self.done.is_set():
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        if self._sampler is not None:
+            self._sampler.join()
+            self._loop.set_task_factory(self._factory)
+        try:
+            if self.mode == "cprofile":
+                self._write_stats()
+            else:
+                self._write_stacks()
+            (self.output / "events.json").write_text(
+                json.dumps([asdict(record) for record in self.events], ensure_ascii=False, indent=2),
+                encoding="utf-8",
+            )
+        except OSError as e:
+            log("WARNING", f"Failed to write profile to {self.output}", e)
+        else:
+            log("INFO", f"Profiled {len(self.events)} events, results written to {self.output}")
+        self.done.set()
+
+    def _write_stats(self) -> None:
+        sessions: dict[str, list[str]] = {}
+        for record in self.events:
+            if not record.profiled:
+                continue
+            sessions.setdefault(record.session, []).append(str(self.output / f"event-{record.index:05d}.prof"))
+        for session, paths in sessions.items():
+            pstats.Stats(*paths).dump_stats(self.output / f"session-{_safe_name(session)}.prof")
+        if sessions:
+            pstats.Stats(*(path for paths in sessions.values() for path in paths)).dump_stats(self.output / "all.prof")
+
+    def _write_stacks(self) -> None:
+        sessions: dict[str, list[str]] = {}
+        for (session, stack), count in self._stacks.items():
+            sessions.setdefault(session, []).append(f"{';'.join(stack)} {count}")
+        with (self.output / "all.folded").open("w", encoding="utf-8") as all_file:
+            for session, lines in sessions.items():
+                (self.output / f"session-{_safe_name(session)}.folded").write_text(
+                    "\n".join(lines) + "\n", encoding="utf-8"
+                )
+                all_file.writelines(f"{_safe_name(session)};{line}\n" for line in lines)
@@ -0,0 +1,171 @@
+import json
+import time
+import asyncio
+from pathlib import Path
+from datetime import datetime
+from collections.abc import Iterator
+from typing import IO, TYPE_CHECKING, Any, Union, Optional
+
+from .message import Message, MessageSegment
+
+if TYPE_CHECKING:
+    from nonechat.message import ConsoleMessage
+    from nonechat.model import User, Event, Channel
+
+    from .adapter import Adapter
+
+
+def dump_user(user: "User") -> dict[str, Any]:
+    from nonechat.model import Robot
+
+    data = {"id": user.id, "avatar": user.avatar, "nickname": user.nickname}
+    if isinstance(user, Robot):
+        data["robot"] = True
+    return data
+
+
+def load_user(data: dict[str, Any]) -> "User":
+    from nonechat.model import User, Robot
+
+    cls = Robot if data.get("robot") else User
+    return cls(data["id"], avatar=data["avatar"], nickname=data["nickname"])
+
+
+def dump_channel(channel: "Channel") -> dict[str, Any]:
+    return {"id": channel.id, "name": channel.name, "description": channel.description, "avatar": channel.avatar}
+
+
+def load_channel(data: dict[str, Any]) -> "Channel":
+    from nonechat.model import Channel
+
+    return Channel(data["id"], data["name"], data["description"], data["avatar"])
+
+
+def dump_message(message: "ConsoleMessage") -> list[list[Any]]:
+    return [[seg.type, seg.data] for seg in Message.from_console_message(message)]
+
+
+def load_message(data: list[list[Any]]) -> "ConsoleMessage":
+    return Message(MessageSegment(type_, seg_data) for type_, seg_data in data).to_console_message()
+
+
+def dump_event(event: "Event") -> dict[str, Any]:
+    """将 nonechat 事件转换为可 JSON 序列化的字典"""
+    from nonechat.model import MessageEvent
+
+    data = {
+        "time": event.time.isoformat(),
+        "self_id": event.self_id,
+        "type": event.type,
+        "user": dump_user(event.user),
+        "channel": dump_channel(event.channel),
+    }
+    if isinstance(event, MessageEvent):
+        data["message_id"] = event.message_id
+        data["message"] = dump_message(event.message)
+    return data
+
+
+def load_event(data: dict[str, Any]) -> "Event":
+    """从 `dump_event` 的结果还原 nonechat 事件"""
+    from nonechat.model import Event, MessageEvent
+
+    kwargs = {
+        "time": datetime.fromisoformat(data["time"]),
+        "self_id": data["self_id"],
+        "type": data["type"],
+        "user": load_user(data["user"]),
+        "channel": load_channel(data["channel"]),
+    }
+    if "message" in data:
+        return MessageEvent(**kwargs, message_id=data["message_id"], message=load_message(data["message"]))
+    return Event(**kwargs)
+
+
+class SessionRecorder:
+    """以 JSON Lines 格式追加记录收到的事件与发出的消息
+
+    每行为一条记录, `ts` 为记录时的 Unix 时间戳, `kind` 为 `event` 或 `send`。
+    文件按行缓冲, 每条记录写入后立即落入文件, 进程崩溃时不会丢失已记录的内容。
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.records = 0
+        self._file: IO[str] = self.path.open("a", buffering=1, encoding="utf-8")
+
+    def _write(self, record: dict[str, Any]) -> None:
+        # Style 等无法直接序列化的值以字符串保存
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str) + "\n")
+        self.records += 1
+
+    def record_event(self, event: "Event") -> None:
+        """记录一个收到的事件"""
+        self._write({"ts": time.time(), "kind": "event", "event": dump_event(event)})
+
+    def record_send(self, bot_id: str, channel: "Channel", contents: list["ConsoleMessage"]) -> None:
+        """记录机器人发出的消息"""
+        self._write(
+            {
+                "ts": time.time(),
+                "kind": "send",
+                "bot": bot_id,
+                "channel": dump_channel(channel),
+                "messages": [dump_message(content) for content in contents],
+            }
+        )
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def iter_records(path: Union[str, Path]) -> Iterator[dict[str, Any]]:
+    """逐条读取录制文件中的记录, 跳过空行"""
+    with Path(path).open(encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+async def replay(adapter: "Adapter", path: Union[str, Path], speed: Optional[float] = 1.0) -> int:
+    """将录制文件中的事件重新送入适配器
+
+    消息事件会先写入前端的聊天记录, 再经由后端派发给机器人。
+
+    Args:
+        adapter (Adapter): 适配器
+        path (Union[str, Path]): 录制文件路径
+        speed (Optional[float]): 回放速度倍率, 为 None 或不大于 0 时不等待, 尽快回放
+
+    Returns:
+        int: 回放的事件数量
+    """
+    from nonechat.model import MessageEvent
+
+    recorder = adapter.recorder
+    if recorder is not None and recorder.path.resolve() == Path(path).resolve():
+        raise ValueError("Cannot replay the recording that is currently being written")
+    frontend = adapter.frontend
+    realtime = speed is not None and speed > 0
+    count = 0
+    first_ts: Optional[float] = None
+    start = time.monotonic()
+    for record in iter_records(path):
+        if record["kind"] != "event":
+            continue
+        if realtime:
+            if first_ts is None:
+                first_ts = record["ts"]
+            if (delay := (record["ts"] - first_ts) / speed - (time.monotonic() - start)) > 0:  # type: ignore
+                await asyncio.sleep(delay)
+        event = load_event(record["event"])
+        if isinstance(event, MessageEvent):
+            await frontend.receive_message(event)
+        await frontend.backend.post_event(event)
+        count += 1
+        if not realtime and count % 1024 == 0:
+            await asyncio.sleep(0)
+    return count
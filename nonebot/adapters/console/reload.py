@@ -0,0 +1,183 @@
+"""插件热重载
+
+定时检查已加载插件的源文件, 发生变化时只卸载并重新导入对应的插件模块,
+前端、聊天记录与机器人连接保持不变。
+
+重载时插件及其子插件的事件响应器 (包括进行中的会话) 会被移除, 由重新导入的模块重新注册;
+导入失败时恢复原有的模块与事件响应器。插件注册的驱动器钩子、定时任务等不会被撤销。
+
+字节码缓存按源文件的修改时间 (秒) 与大小校验, 同一秒内修改且大小不变的源文件可能载入旧的字节码缓存,
+此时再次保存文件即可。
+"""
+
+import sys
+import asyncio
+import importlib
+import sysconfig
+import contextlib
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+from nonebot.matcher import matchers
+from nonebot.plugin import Plugin, _plugins, _revert_plugin, get_loaded_plugins
+
+from .utils import log
+
+if TYPE_CHECKING:
+    from .adapter import Adapter
+
+_LIBRARY_PATHS = tuple(
+    Path(path).resolve() for path in {sysconfig.get_paths()["purelib"], sysconfig.get_paths()["platlib"]}
+)
+
+
+def _descendants(plugin: Plugin) -> list[Plugin]:
+    result = [plugin]
+    for sub_plugin in plugin.sub_plugins:
+        result.extend(_descendants(sub_plugin))
+    return result
+
+
+def _ancestors(plugin: Plugin) -> list[Plugin]:
+    result = []
+    while (parent := plugin.parent_plugin) is not None:
+        result.append(parent)
+        plugin = parent
+    return result
+
+
+def _owns_module(module_names: set[str], name: str) -> bool:
+    return name in module_names or any(name.startswith(f"{module_name}.") for module_name in module_names)
+
+
+def reload_plugin(plugin: Plugin) -> Plugin:
+    """卸载并重新导入插件及其子插件, 返回新的插件
+
+    导入失败时恢复原有的插件并抛出 `RuntimeError`。
+    """
+    plugins = _descendants(plugin)
+    plugin_ids = {p.id_ for p in plugins}
+    module_names = {p.module_name for p in plugins}
+    old_modules = {name: module for name, module in sys.modules.items() if _owns_module(module_names, name)}
+    old_matchers = [m for priority in matchers.values() for m in priority if m.plugin_id in plugin_ids]
+
+    for matcher in old_matchers:
+        matcher.destroy()
+    for p in reversed(plugins):
+        _revert_plugin(p)
+    for name in old_modules:
+        del sys.modules[name]
+    importlib.invalidate_caches()
+
+    existing_plugins = set(_plugins)
+    existing_matchers = {m for priority in matchers.values() for m in priority}
+    if (new_plugin := plugin.manager.load_plugin(plugin.module_name)) is not None:
+        return new_plugin
+
+    # 撤销导入失败前注册的插件与事件响应器, 再恢复原有的插件
+    for plugin_id in set(_plugins) - existing_plugins:
+        _revert_plugin(_plugins[plugin_id])
+    for priority in matchers.values():
+        priority[:] = [m for m in priority if m in existing_matchers]
+    for name in [name for name in sys.modules if _owns_module(module_names, name)]:
+        del sys.modules[name]
+    sys.modules.update(old_modules)
+    for p in plugins:
+        _plugins[p.id_] = p
+        if p.parent_plugin is not None:
+            p.parent_plugin.sub_plugins.add(p)
+    for matcher in old_matchers:
+        matchers[matcher.priority].append(matcher)
+    raise RuntimeError(f"Failed to reload plugin {plugin.id_}, previous version restored")
+
+
+class PluginReloader:
+    """检查插件源文件并重载发生变化的插件
+
+    安装在 site-packages 中的插件不会被检查。
+    """
+
+    def __init__(self, adapter: "Adapter", interval: float = 0.2):
+        self.adapter = adapter
+        self.interval = interval
+        self.reloads = 0
+        """成功重载的次数"""
+        self._mtimes: dict[Path, tuple[int, int]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._mtimes = self._scan(list(self._roots()))
+        self._task = asyncio.create_task(self._watch())
+        log("INFO", f"Watching {len(self._mtimes)} plugin files for changes")
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _roots(self) -> dict[Path, Plugin]:
+        """插件的源文件或包目录, 以及对应的插件"""
+        roots: dict[Path, Plugin] = {}
+        for plugin in get_loaded_plugins():
+            if (file := getattr(plugin.module, "__file__", None)) is None:
+                continue
+            path = Path(file).resolve()
+            if path.name == "__init__.py":
+                path = path.parent
+            if not any(path.is_relative_to(library) for library in _LIBRARY_PATHS):
+                roots[path] = plugin
+        return roots
+
+    @staticmethod
+    def _scan(roots: list[Path]) -> dict[Path, tuple[int, int]]:
+        mtimes: dict[Path, tuple[int, int]] = {}
+        for root in roots:
+            for path in root.rglob("*.py") if root.is_dir() else (root,):
+                with contextlib.suppress(OSError):
+                    stat = path.stat()
+                    mtimes[path] = (stat.st_mtime_ns, stat.st_size)
+        return mtimes
+
+    def _owner(self, path: Path, roots: dict[Path, Plugin]) -> Optional[Plugin]:
+        """包含该文件的最内层插件"""
+        for parent in (path, *path.parents):
+            if (plugin := roots.get(parent)) is not None:
+                return plugin
+        return None
+
+    async def changed_plugins(self) -> list[Plugin]:
+        """自上次检查以来源文件发生变化的插件, 子插件与父插件同时变化时只返回父插件"""
+        # 遍历目录与读取文件状态会阻塞, 在线程中进行
+        mtimes = await asyncio.to_thread(self._scan, list(self._roots()))
+        changed = {path for path, mtime in mtimes.items() if self._mtimes.get(path) != mtime}
+        changed.update(self._mtimes.keys() - mtimes.keys())
+        self._mtimes = mtimes
+        if not changed:
+            return []
+        roots = self._roots()
+        plugins = {plugin.id_: plugin for path in changed if (plugin := self._owner(path, roots)) is not None}
+        return [
+            plugin for plugin in plugins.values() if not any(parent.id_ in plugins for parent in _ancestors(plugin))
+        ]
+
+    def reload(self, plugin: Plugin) -> Optional[Plugin]:
+        try:
+            new_plugin = reload_plugin(plugin)
+        except Exception as e:
+            log("ERROR", f"Failed to reload plugin {plugin.id_}", e)
+            self.adapter.frontend.notify(f"Failed to reload {plugin.id_}", title="Plugin Reload")
+            return None
+        self.reloads += 1
+        log("SUCCESS", f"Reloaded plugin {new_plugin.id_}")
+        self.adapter.frontend.notify(f"Reloaded {new_plugin.id_}", title="Plugin Reload")
+        return new_plugin
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                for plugin in await self.changed_plugins():
+                    self.reload(plugin)
+            except Exception as e:
+                # 检查失败不应结束监视, 下一轮重新检查
+                log("ERROR", "Failed to check plugin files for changes", e)
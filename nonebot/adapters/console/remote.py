@@ -0,0 +1,317 @@
+"""远程前端
+
+机器人进程以 headless 模式运行, 通过 Unix 套接字或本地 TCP 端口向一个或多个前端进程推送消息,
+前端进程在本地渲染, 机器人进程不承担任何渲染开销。
+
+每一帧由 4 字节大端长度与 UTF-8 编码的 JSON 对象组成, `op` 字段表示帧类型:
+
+- `hello` (服务端): 连接建立后发送当前的机器人与频道
+- `event` (双向): 用户发送的事件, 服务端会转发给其他前端
+- `send`/`edit`/`recall`/`bell` (服务端): 机器人调用对应 API 的结果
+
+用法: python -m nonebot.adapters.console.remote unix:/tmp/nonebot-console.sock
+"""
+
+import sys
+import json
+import struct
+import asyncio
+import contextlib
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Union, Optional
+
+from nonechat import Backend
+from nonechat.model import Robot, Channel
+from nonechat.model import Event as ConsoleEvent
+from nonechat.model import MessageEvent as ConsoleMessageEvent
+
+from .utils import log
+from .recording import (
+    dump_user,
+    load_user,
+    dump_event,
+    load_event,
+    dump_channel,
+    dump_message,
+    load_channel,
+    load_message,
+)
+
+if TYPE_CHECKING:
+    from .bot import Bot
+    from .adapter import Adapter
+
+_HEADER = struct.Struct(">I")
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+"""单帧的最大长度"""
+
+
+def encode_frame(payload: dict[str, Any]) -> bytes:
+    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str).encode()
+    return _HEADER.pack(len(data)) + data
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Optional[dict[str, Any]]:
+    """读取一帧, 连接关闭时返回 None"""
+    try:
+        (size,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+        if size > MAX_FRAME_SIZE:
+            raise ValueError(f"Frame too large: {size} bytes")
+        return json.loads(await reader.readexactly(size))
+    except asyncio.IncompleteReadError:
+        return None
+
+
+def parse_address(address: str) -> Union[str, tuple[str, int]]:
+    """解析 `unix:<path>` 或 `tcp:<host>:<port>` 地址, 返回套接字路径或主机与端口, 主机默认为 127.0.0.1"""
+    if address.startswith("unix:"):
+        return address[5:]
+    host, _, port = address.removeprefix("tcp:").rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+async def open_connection(address: str) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    if isinstance(target := parse_address(address), str):
+        return await asyncio.open_unix_connection(target)
+    return await asyncio.open_connection(*target)
+
+
+class _Client:
+    __slots__ = ("writer", "queue", "task")
+
+    def __init__(self, writer: asyncio.StreamWriter, queue_size: int):
+        self.writer = writer
+        self.queue: asyncio.Queue[bytes] = asyncio.Queue(queue_size)
+        self.task = asyncio.create_task(self._write_loop())
+
+    async def _write_loop(self) -> None:
+        with contextlib.suppress(ConnectionError):
+            while True:
+                self.writer.write(await self.queue.get())
+                await self.writer.drain()
+
+    def close(self) -> None:
+        self.task.cancel()
+        self.writer.close()
+
+
+class RemoteServer:
+    """向远程前端推送机器人消息的服务端
+
+    每个前端拥有独立的发送队列, 队列已满的前端会被断开, 不会阻塞机器人。
+    """
+
+    def __init__(self, adapter: "Adapter", queue_size: int = 1024):
+        self.adapter = adapter
+        self.queue_size = queue_size
+        self.clients: set[_Client] = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, address: str) -> None:
+        if isinstance(target := parse_address(address), str):
+            self._server = await asyncio.start_unix_server(self._handle, target)
+        else:
+            self._server = await asyncio.start_server(self._handle, *target)
+        self.adapter.clients.append(self.on_api)
+        log("INFO", f"Remote console listening on {address}")
+
+    async def close(self) -> None:
+        with contextlib.suppress(ValueError):
+            self.adapter.clients.remove(self.on_api)
+        for client in list(self.clients):
+            client.close()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def broadcast(self, payload: dict[str, Any], exclude: Optional[_Client] = None) -> None:
+        if not self.clients:
+            return
+        frame = encode_frame(payload)
+        for client in list(self.clients):
+            if client is exclude:
+                continue
+            try:
+                client.queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                log("WARNING", "Remote console client is too slow, disconnected")
+                self.clients.discard(client)
+                client.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        client = _Client(writer, self.queue_size)
+        self.clients.add(client)
+        backend = self.adapter.frontend.backend
+        client.queue.put_nowait(
+            encode_frame(
+                {
+                    "op": "hello",
+                    "bots": [dump_user(bot) for bot in backend.storage.bots.values()],
+                    "channels": [dump_channel(channel) for channel in backend.storage.channels.values()],
+                }
+            )
+        )
+        try:
+            while True:
+                try:
+                    if (payload := await read_frame(reader)) is None:
+                        break
+                    event = load_event(payload["event"]) if payload.get("op") == "event" else None
+                except (json.JSONDecodeError, UnicodeDecodeError, KeyError, TypeError, AttributeError) as e:
+                    # 帧的长度有效, 跳过内容错误的帧即可继续读取
+                    log("WARNING", "Ignored malformed frame from remote console client", e)
+                    continue
+                if event is not None:
+                    await self._post_event(event, client)
+        except (ConnectionError, ValueError) as e:
+            log("WARNING", "Remote console client disconnected", e)
+        finally:
+            self.clients.discard(client)
+            client.close()
+
+    async def _post_event(self, event: ConsoleEvent, origin: _Client) -> None:
+        frontend = self.adapter.frontend
+        if isinstance(event, ConsoleMessageEvent):
+            await frontend.receive_message(event)
+        self.broadcast({"op": "event", "event": dump_event(event)}, exclude=origin)
+        await frontend.backend.post_event(event)
+
+    def _dump_channel(self, channel_id: str) -> dict[str, Any]:
+        # 私聊频道不在频道列表中, 随帧发送完整的频道信息, 前端无需事先知道该频道
+        if (channel := self.adapter.frontend.backend.lookup_channel(channel_id)) is None:
+            return {"id": channel_id, "name": channel_id, "description": "", "avatar": ""}
+        return dump_channel(channel)
+
+    async def on_api(self, bot: "Bot", api: str, data: dict[str, Any]) -> None:
+        """`Adapter.clients` 回调, 将 API 调用结果推送给所有前端"""
+        if api == "send_msg":
+            messages = [[data["result"], dump_message(data["content"])]]
+        elif api == "send_msgs":
+            messages = [[i, dump_message(c)] for i, c in zip(data["result"], data["contents"])]
+        elif api == "edit_msg":
+            self.broadcast(
+                {
+                    "op": "edit",
+                    "channel": self._dump_channel(data["channel_id"]),
+                    "message_id": data["message_id"],
+                    "message": dump_message(data["content"]),
+                }
+            )
+            return
+        elif api == "recall_msg":
+            self.broadcast(
+                {"op": "recall", "channel": self._dump_channel(data["channel_id"]), "message_id": data["message_id"]}
+            )
+            return
+        elif api == "bell":
+            self.broadcast({"op": "bell"})
+            return
+        else:
+            return
+        self.broadcast(
+            {"op": "send", "bot": dump_user(bot.info), "channel": dump_channel(data["channel"]), "messages": messages}
+        )
+
+
+class RemoteBackend(Backend):
+    """远程前端进程使用的后端, 将用户事件发往机器人进程并渲染收到的消息"""
+
+    address: str = "unix:nonebot-console.sock"
+
+    def __init__(self, frontend):
+        super().__init__(frontend)
+        self.current_user.id = "user"
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def on_console_load(self):
+        pass
+
+    async def on_console_mount(self):
+        reader, self._writer = await open_connection(self.address)
+        self._task = asyncio.create_task(self._read_loop(reader))
+
+    async def on_console_unmount(self):
+        if self._task is not None:
+            self._task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+
+    async def post_event(self, event: ConsoleEvent):
+        if self._writer is not None:
+            self._writer.write(encode_frame({"op": "event", "event": dump_event(event)}))
+            await self._writer.drain()
+
+    async def _read_loop(self, reader: asyncio.StreamReader) -> None:
+        message = "Disconnected from bot"
+        try:
+            while (payload := await read_frame(reader)) is not None:
+                await self._handle(payload)
+        except (ConnectionError, ValueError, KeyError, TypeError) as e:
+            # 连接中断或收到格式错误的帧
+            log("WARNING", "Remote console connection lost", e)
+            message = f"Disconnected from bot: {e!r}"
+        self.frontend.notify(message, title="Remote Console", severity="error")
+
+    def _channel(self, data: dict[str, Any]) -> Channel:
+        """优先使用已登记的频道实例, 私聊等未登记的频道按帧中的信息构造"""
+        return self.storage.channels.get(data["id"]) or load_channel(data)
+
+    async def _handle(self, payload: dict[str, Any]) -> None:
+        op = payload.get("op")
+        if op == "hello":
+            for index, data in enumerate(payload["bots"]):
+                bot = load_user(data)
+                if index == 0 and isinstance(bot, Robot):
+                    # 以机器人进程的默认机器人替换本地的占位机器人, 而不是修改已登记实例的 ID
+                    if self.storage.bots.get(self.current_bot.id) is self.current_bot:
+                        del self.storage.bots[self.current_bot.id]
+                    self.current_bot = bot
+                await self.add_bot(bot)  # type: ignore
+            for data in payload["channels"]:
+                await self.add_channel(load_channel(data))
+        elif op == "event":
+            event = load_event(payload["event"])
+            if isinstance(event, ConsoleMessageEvent):
+                await self.frontend.receive_message(event)
+        elif op == "send":
+            bot, channel = load_user(payload["bot"]), load_channel(payload["channel"])
+            for message_id, content in payload["messages"]:
+                await self.frontend.receive_message(
+                    ConsoleMessageEvent(
+                        time=datetime.now(),
+                        self_id=bot.id,
+                        type="console.message",
+                        user=bot,
+                        message_id=message_id,
+                        message=load_message(content),
+                        channel=channel,
+                    )
+                )
+        elif op == "edit":
+            channel = self._channel(payload["channel"])
+            await self.frontend.edit_message(payload["message_id"], load_message(payload["message"]), channel)
+        elif op == "recall":
+            await self.frontend.recall_message(payload["message_id"], self._channel(payload["channel"]))
+        elif op == "bell":
+            await self.frontend.toggle_bell()
+
+
+def main(address: Union[str, None] = None) -> None:
+    from textual.color import Color
+    from nonechat.app import Frontend
+    from nonechat.setting import ConsoleSetting
+
+    RemoteBackend.address = address or (sys.argv[1] if len(sys.argv) > 1 else RemoteBackend.address)
+    setting = ConsoleSetting(
+        title="Nonebot",
+        sub_title="remote console",
+        toolbar_exit="❌",
+        icon_color=Color.parse("#EA5252"),
+    )
+    Frontend(RemoteBackend, setting).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""虚拟时钟
+
+安装到事件循环后, `loop.time()` 与事件时间戳均由虚拟时钟提供。
+事件循环空闲并等待定时器时, 虚拟时钟直接快进到最近的定时器, 不再实际等待,
+因此 `asyncio.sleep`、`call_later` 等依赖事件循环时间的逻辑可以在数秒内模拟数小时的运行。
+
+快进只在没有就绪的 I/O 时发生, 依赖真实 I/O 超时的逻辑 (如网络请求) 在模拟模式下会立即超时。
+"""
+
+import asyncio
+from typing import Any, Optional
+from datetime import datetime, timedelta
+
+
+class VirtualClock:
+    """可控的虚拟时钟
+
+    Args:
+        start (Optional[datetime]): 虚拟时间的起点, 默认为创建时的当前时间
+        auto_advance (bool): 事件循环空闲时是否自动快进到最近的定时器
+    """
+
+    def __init__(self, start: Optional[datetime] = None, auto_advance: bool = True):
+        self.start = start or datetime.now()
+        self.auto_advance = auto_advance
+        self.elapsed = 0.0
+        """已经过的虚拟时间, 单位为秒"""
+        self._base = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._select: Optional[Any] = None
+
+    def time(self) -> float:
+        """事件循环使用的单调时间"""
+        return self._base + self.elapsed
+
+    def now(self) -> datetime:
+        """当前的虚拟时间"""
+        return self.start + timedelta(seconds=self.elapsed)
+
+    def advance(self, seconds: float) -> None:
+        """将虚拟时间向前推进, 到期的定时器在下一轮事件循环中执行"""
+        if seconds < 0:
+            raise ValueError("Virtual clock cannot go backwards")
+        self.elapsed += seconds
+
+    def install(self, loop: asyncio.AbstractEventLoop) -> None:
+        """接管事件循环的时间与 I/O 等待
+
+        仅支持基于 selector 的事件循环。
+        """
+        if self._loop is not None:
+            raise RuntimeError("Virtual clock is already installed")
+        if (selector := getattr(loop, "_selector", None)) is None:
+            raise RuntimeError(f"Virtual clock requires a selector event loop, got {type(loop).__name__}")
+        # 从当前时间继续, 已有定时器的到期时间保持有效
+        self._base = loop.time() - self.elapsed
+        self._loop = loop
+        self._select = selector.select
+        loop.time = self.time  # type: ignore
+        selector.select = self._virtual_select
+
+    def uninstall(self) -> None:
+        """恢复事件循环的时间与 I/O 等待, 之后创建的定时器使用真实时间"""
+        if self._loop is None:
+            return
+        del self._loop.time  # type: ignore
+        self._loop._selector.select = self._select  # type: ignore
+        self._loop = None
+        self._select = None
+
+    def _virtual_select(self, timeout: Optional[float] = None) -> list:
+        select = self._select
+        if not self.auto_advance or timeout == 0:
+            return select(timeout)  # type: ignore
+        if (events := select(0)) or timeout is None:  # type: ignore
+            # 没有定时器时只能等待真实 I/O
+            return events or select(None)  # type: ignore
+        self.elapsed += timeout
+        return []
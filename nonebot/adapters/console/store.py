@@ -0,0 +1,437 @@
+import json
+import asyncio
+import sqlite3
+from pathlib import Path
+from secrets import token_hex
+from typing import Union, Optional
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+
+from nonechat.message import ConsoleMessage
+from nonechat.model import DIRECT, User, Channel
+from nonechat.backend.storage import MessageStorage
+from nonechat.model import MessageEvent as ConsoleMessageEvent
+
+from .utils import log
+from .recording import dump_event, load_event
+
+
+class MessageStore(ABC):
+    """聊天记录存储
+
+    以 `(channel_id, message_id)` 为键保存消息, 每个频道最多保留 `retention` 条,
+    超出时淘汰最早的消息。`retention` 不大于 0 时不限制数量。
+    """
+
+    def __init__(self, retention: int = 500):
+        self.retention = retention
+
+    @abstractmethod
+    def put(self, channel_id: str, message: ConsoleMessageEvent) -> None:
+        """写入一条消息"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, channel_id: str, message_id: str) -> Optional[ConsoleMessageEvent]:
+        """获取一条消息"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def edit(self, channel_id: str, message_id: str, content: ConsoleMessage) -> bool:
+        """修改消息内容, 返回消息是否存在"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def remove(self, channel_id: str, message_id: str) -> bool:
+        """删除一条消息, 返回消息是否存在"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def page(self, channel_id: str, after: Optional[str] = None, limit: int = 50) -> list[ConsoleMessageEvent]:
+        """按时间顺序获取一页消息
+
+        Args:
+            channel_id (str): 频道 ID
+            after (Optional[str]): 游标, 返回该消息之后的消息; 为 None 时从最早的消息开始
+            limit (int): 最多返回的消息数量
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_history(self, channel_id: str, batch_size: int = 100) -> Iterator[ConsoleMessageEvent]:
+        """按时间顺序逐条遍历频道的聊天记录, 每次最多加载 `batch_size` 条"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def clear(self, channel_id: str) -> None:
+        """清空频道的聊天记录"""
+        raise NotImplementedError
+
+    def history(self, channel_id: str) -> list[ConsoleMessageEvent]:
+        """获取频道的全部聊天记录"""
+        return list(self.iter_history(channel_id))
+
+    def close(self) -> None:
+        pass
+
+
+class _ChannelHistory:
+    """单个频道的聊天记录, 每条消息附带频道内递增的序号, 用于以消息 ID 为游标分页"""
+
+    __slots__ = ("messages", "seqs", "ids", "first_seq", "next_seq")
+
+    def __init__(self):
+        self.messages: OrderedDict[str, ConsoleMessageEvent] = OrderedDict()
+        self.seqs: dict[str, int] = {}
+        self.ids: dict[int, str] = {}
+        self.first_seq = 0
+        """最早一条未被淘汰的消息的序号下界"""
+        self.next_seq = 0
+
+    def put(self, message: ConsoleMessageEvent) -> None:
+        message_id = message.message_id
+        if message_id not in self.messages:
+            self.seqs[message_id] = self.next_seq
+            self.ids[self.next_seq] = message_id
+            self.next_seq += 1
+        self.messages[message_id] = message
+
+    def pop_oldest(self) -> None:
+        message_id, _ = self.messages.popitem(last=False)
+        seq = self.seqs.pop(message_id)
+        del self.ids[seq]
+        self.first_seq = seq + 1
+
+    def remove(self, message_id: str) -> bool:
+        if self.messages.pop(message_id, None) is None:
+            return False
+        del self.ids[self.seqs.pop(message_id)]
+        return True
+
+
+class MemoryMessageStore(MessageStore):
+    """内存中的聊天记录存储
+
+    消息按写入顺序保存, 超出 `retention` 时淘汰最早写入的消息 (FIFO), 读取不会改变消息的顺序。
+    按消息 ID 查找与定位分页游标均为 O(1)。
+    """
+
+    def __init__(self, retention: int = 500):
+        super().__init__(retention)
+        self._channels: dict[str, _ChannelHistory] = {}
+
+    def put(self, channel_id: str, message: ConsoleMessageEvent) -> None:
+        if (history := self._channels.get(channel_id)) is None:
+            history = self._channels[channel_id] = _ChannelHistory()
+        history.put(message)
+        if self.retention > 0:
+            while len(history.messages) > self.retention:
+                history.pop_oldest()
+
+    def get(self, channel_id: str, message_id: str) -> Optional[ConsoleMessageEvent]:
+        if history := self._channels.get(channel_id):
+            return history.messages.get(message_id)
+        return None
+
+    def edit(self, channel_id: str, message_id: str, content: ConsoleMessage) -> bool:
+        if message := self.get(channel_id, message_id):
+            message.message = content
+            return True
+        return False
+
+    def remove(self, channel_id: str, message_id: str) -> bool:
+        if history := self._channels.get(channel_id):
+            return history.remove(message_id)
+        return False
+
+    def page(self, channel_id: str, after: Optional[str] = None, limit: int = 50) -> list[ConsoleMessageEvent]:
+        if (history := self._channels.get(channel_id)) is None:
+            return []
+        if after is None:
+            seq = history.first_seq
+        elif (cursor := history.seqs.get(after)) is None:
+            return []
+        else:
+            seq = cursor + 1
+        result = []
+        # 被删除的消息会在序号中留下空位, 跳过即可
+        while seq < history.next_seq and len(result) < limit:
+            if (message_id := history.ids.get(seq)) is not None:
+                result.append(history.messages[message_id])
+            seq += 1
+        return result
+
+    def iter_history(self, channel_id: str, batch_size: int = 100) -> Iterator[ConsoleMessageEvent]:
+        # 消息已全部在内存中, 遍历快照即可避免迭代过程中的修改影响
+        if history := self._channels.get(channel_id):
+            yield from list(history.messages.values())
+
+    def clear(self, channel_id: str) -> None:
+        self._channels.pop(channel_id, None)
+
+
+class SQLiteMessageStore(MessageStore):
+    """基于 SQLite 的持久化聊天记录存储
+
+    消息以 JSON 保存。写入在同一事务中累积, 每 `commit_interval` 秒或累计 `commit_size` 次写入后提交一次,
+    未提交的写入对本连接的读取可见, 进程崩溃时最多丢失最后一批写入。
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        retention: int = 500,
+        commit_interval: float = 0.2,
+        commit_size: int = 256,
+    ):
+        super().__init__(retention)
+        self.path = Path(path)
+        self.commit_interval = commit_interval
+        self.commit_size = commit_size
+        self._conn = sqlite3.connect(self.path)
+        self._conn.executescript("""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS chat_messages (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                channel_id TEXT NOT NULL,
+                message_id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                UNIQUE (channel_id, message_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_chat_messages_channel_seq ON chat_messages (channel_id, seq);
+            """)
+        if self._conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages'").fetchone():
+            log("WARNING", f"Ignoring pickled chat history in {self.path}, it is no longer loaded")
+        self._counts: dict[str, int] = {}
+        self._pending = 0
+        self._commit_handle: Optional[asyncio.TimerHandle] = None
+
+    def _count(self, channel_id: str) -> int:
+        if channel_id not in self._counts:
+            (count,) = self._conn.execute(
+                "SELECT COUNT(*) FROM chat_messages WHERE channel_id = ?", (channel_id,)
+            ).fetchone()
+            self._counts[channel_id] = count
+        return self._counts[channel_id]
+
+    def _written(self) -> None:
+        """记录一次写入, 达到批量大小时立即提交, 否则延后提交"""
+        self._pending += 1
+        if self._pending >= self.commit_size:
+            self.commit()
+            return
+        if self._commit_handle is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                # 不在事件循环中时直接提交
+                self.commit()
+                return
+            self._commit_handle = loop.call_later(self.commit_interval, self.commit)
+
+    def commit(self) -> None:
+        """提交累积的写入"""
+        if self._commit_handle is not None:
+            self._commit_handle.cancel()
+            self._commit_handle = None
+        if not self._pending:
+            return
+        self._pending = 0
+        try:
+            self._conn.commit()
+        except sqlite3.Error as e:
+            log("WARNING", f"Failed to commit chat history to {self.path}", e)
+
+    def put(self, channel_id: str, message: ConsoleMessageEvent) -> None:
+        payload = _dumps(message)
+        # 已存在的消息原地更新, 保留原有的顺序, 与 MemoryMessageStore 一致
+        cursor = self._conn.execute(
+            "UPDATE chat_messages SET payload = ? WHERE channel_id = ? AND message_id = ?",
+            (payload, channel_id, message.message_id),
+        )
+        if cursor.rowcount:
+            self._written()
+            return
+        count = self._count(channel_id)
+        self._conn.execute(
+            "INSERT INTO chat_messages (channel_id, message_id, payload) VALUES (?, ?, ?)",
+            (channel_id, message.message_id, payload),
+        )
+        count += 1
+        if self.retention > 0 and count > self.retention:
+            self._conn.execute(
+                "DELETE FROM chat_messages WHERE seq IN "
+                "(SELECT seq FROM chat_messages WHERE channel_id = ? ORDER BY seq LIMIT ?)",
+                (channel_id, count - self.retention),
+            )
+            count = self.retention
+        self._counts[channel_id] = count
+        self._written()
+
+    def get(self, channel_id: str, message_id: str) -> Optional[ConsoleMessageEvent]:
+        row = self._conn.execute(
+            "SELECT payload FROM chat_messages WHERE channel_id = ? AND message_id = ?", (channel_id, message_id)
+        ).fetchone()
+        return _loads(row[0]) if row else None
+
+    def edit(self, channel_id: str, message_id: str, content: ConsoleMessage) -> bool:
+        if (message := self.get(channel_id, message_id)) is None:
+            return False
+        message.message = content
+        self._conn.execute(
+            "UPDATE chat_messages SET payload = ? WHERE channel_id = ? AND message_id = ?",
+            (_dumps(message), channel_id, message_id),
+        )
+        self._written()
+        return True
+
+    def remove(self, channel_id: str, message_id: str) -> bool:
+        cursor = self._conn.execute(
+            "DELETE FROM chat_messages WHERE channel_id = ? AND message_id = ?", (channel_id, message_id)
+        )
+        if not cursor.rowcount:
+            return False
+        if channel_id in self._counts:
+            self._counts[channel_id] -= cursor.rowcount
+        self._written()
+        return True
+
+    def _page_after_seq(self, channel_id: str, seq: int, limit: int) -> list[tuple[int, str]]:
+        return self._conn.execute(
+            "SELECT seq, payload FROM chat_messages WHERE channel_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+            (channel_id, seq, limit),
+        ).fetchall()
+
+    def page(self, channel_id: str, after: Optional[str] = None, limit: int = 50) -> list[ConsoleMessageEvent]:
+        seq = -1
+        if after is not None:
+            row = self._conn.execute(
+                "SELECT seq FROM chat_messages WHERE channel_id = ? AND message_id = ?", (channel_id, after)
+            ).fetchone()
+            if row is None:
+                return []
+            seq = row[0]
+        return [_loads(payload) for _, payload in self._page_after_seq(channel_id, seq, limit)]
+
+    def iter_history(self, channel_id: str, batch_size: int = 100) -> Iterator[ConsoleMessageEvent]:
+        seq = -1
+        while rows := self._page_after_seq(channel_id, seq, batch_size):
+            for seq, payload in rows:
+                yield _loads(payload)
+
+    def clear(self, channel_id: str) -> None:
+        self._conn.execute("DELETE FROM chat_messages WHERE channel_id = ?", (channel_id,))
+        self._counts[channel_id] = 0
+        self._written()
+
+    def close(self) -> None:
+        self.commit()
+        self._conn.close()
+
+
+def _dumps(message: ConsoleMessageEvent) -> str:
+    return json.dumps(dump_event(message), ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _loads(payload: str) -> ConsoleMessageEvent:
+    return load_event(json.loads(payload))  # type: ignore
+
+
+class OrderedIndex:
+    """按登记顺序保存的 ID 索引
+
+    只支持追加, 以 ID 为游标定位为 O(1), 分页时不需要遍历游标之前的条目。
+    """
+
+    __slots__ = ("_ids", "_positions")
+
+    def __init__(self, ids: Iterable[str] = ()):
+        self._ids: list[str] = []
+        self._positions: dict[str, int] = {}
+        for id_ in ids:
+            self.add(id_)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, id_: object) -> bool:
+        return id_ in self._positions
+
+    def add(self, id_: str) -> bool:
+        """登记 ID, 已登记时返回 False"""
+        if id_ in self._positions:
+            return False
+        self._positions[id_] = len(self._ids)
+        self._ids.append(id_)
+        return True
+
+    def page(self, after: Optional[str] = None, limit: Optional[int] = None) -> list[str]:
+        """按登记顺序获取一页 ID
+
+        Args:
+            after (Optional[str]): 游标, 返回该 ID 之后登记的 ID; 为 None 时从最早登记的 ID 开始, 游标未登记时返回空列表
+            limit (Optional[int]): 最多返回的数量, 为 None 时返回游标之后的全部 ID
+        """
+        if after is None:
+            start = 0
+        elif (position := self._positions.get(after)) is None:
+            return []
+        else:
+            start = position + 1
+        return self._ids[start:] if limit is None else self._ids[start : start + limit]
+
+
+class ConsoleStorage(MessageStorage):
+    """将 nonechat 的聊天记录读写转发到 `MessageStore` 的存储
+
+    用户与频道另外按登记顺序建立索引, 用于分页获取。
+    """
+
+    def __init__(self, store: MessageStore):
+        super().__init__()
+        self.store = store
+        self.user_index = OrderedIndex(self.users)
+        self.channel_index = OrderedIndex(id_ for id_ in self.channels if id_ != DIRECT.id)
+
+    def add_user(self, user: User):
+        if super().add_user(user):
+            self.user_index.add(user.id)
+            return True
+        return False
+
+    def add_channel(self, channel: Channel):
+        if super().add_channel(channel):
+            self.channel_index.add(channel.id)
+            return True
+        return False
+
+    def page_users(self, after: Optional[str] = None, limit: Optional[int] = None) -> list[User]:
+        """按登记顺序分页获取用户, 参数同 `OrderedIndex.page`"""
+        return [self.users[id_] for id_ in self.user_index.page(after, limit)]
+
+    def page_channels(self, after: Optional[str] = None, limit: Optional[int] = None) -> list[Channel]:
+        """按登记顺序分页获取频道, 不包括 DIRECT, 参数同 `OrderedIndex.page`"""
+        return [self.channels[id_] for id_ in self.channel_index.page(after, limit)]
+
+    def chat_history(self, channel: Channel) -> list[ConsoleMessageEvent]:
+        return self.store.history(channel.id)
+
+    def write_chat(self, message: ConsoleMessageEvent, channel: Channel) -> str:
+        if message.message_id == "_unset_":
+            message.message_id = token_hex(8)
+        self.store.put(channel.id, message)
+        return message.message_id
+
+    def remove_chat(self, message_id: str, channel: Channel):
+        self.store.remove(channel.id, message_id)
+
+    def edit_chat(self, message_id: str, content: ConsoleMessage, channel: Channel):
+        return self.store.edit(channel.id, message_id, content)
+
+    def get_chat(self, message_id: str, channel: Channel) -> Optional[ConsoleMessageEvent]:
+        return self.store.get(channel.id, message_id)
+
+    def clear_chat_history(self, channel: Channel):
+        self.store.clear(channel.id)
@@ -0,0 +1,141 @@
+import asyncio
+from types import TracebackType
+from typing_extensions import Self
+from typing import TYPE_CHECKING, Union, Optional
+
+from .utils import log
+from .message import Message, MessageSegment
+
+if TYPE_CHECKING:
+    from nonechat.model import Channel
+    from nonechat.message import Element, ConsoleMessage
+
+    from .bot import Bot
+
+
+class MessageStream:
+    """流式发送的消息
+
+    进入上下文时发送初始消息, 之后通过 `write` 追加的文本会按 `fps` 合并为一次编辑。
+    追加的文本合并到消息末尾的文本元素中, 消息的元素数量不随写入次数增长, 每次编辑的消息都是完整一致的。
+    延后发送的编辑失败时, 异常会在下一次 `write` 或 `close` 时抛出::
+
+        async with bot.send_stream(event) as stream:
+            async for token in generate():
+                await stream.write(token)
+    """
+
+    def __init__(
+        self,
+        bot: "Bot",
+        channel: "Channel",
+        message: Union[str, Message, MessageSegment] = "",
+        fps: float = 20.0,
+    ):
+        self.bot = bot
+        self.channel = channel
+        self.interval = 1 / fps if fps > 0 else 0.0
+        self.message_id: Optional[str] = None
+        """消息 ID, 进入上下文后可用"""
+        self.edits = 0
+        """实际发送的编辑次数"""
+        from nonechat.message import Text
+
+        self._prefix: list[Element] = list(Message(message).to_console_message())
+        self._lead = ""
+        """初始消息末尾的文本, 追加的文本与其合并为同一个元素"""
+        if self._prefix and type(self._prefix[-1]) is Text:
+            self._lead = self._prefix.pop().text  # type: ignore
+        self._text = ""
+        self._pending: list[str] = []
+        self._last_edit = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._task: Optional[asyncio.Task] = None
+        self._error: Optional[BaseException] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def text(self) -> str:
+        """已写入的全部文本"""
+        return self._text + "".join(self._pending)
+
+    async def __aenter__(self) -> Self:
+        from nonechat.message import Text, ConsoleMessage
+
+        self._lock = asyncio.Lock()
+        # 末尾的文本元素即使为空也保留, 初始消息不能为空, 否则前端不会显示
+        content = ConsoleMessage([*self._prefix, Text(self._lead)])
+        self.message_id = await self.bot.call_api("send_msg", content=content, channel=self.channel)
+        self._last_edit = asyncio.get_running_loop().time()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        await self.close()
+
+    async def write(self, text: str) -> None:
+        """追加文本, 距上次编辑不足一帧时延后合并发送"""
+        if self.message_id is None:
+            raise RuntimeError("MessageStream must be entered before writing")
+        self._raise_error()
+        if not text:
+            return
+        self._pending.append(text)
+        loop = asyncio.get_running_loop()
+        if (delay := self._last_edit + self.interval - loop.time()) <= 0:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(delay, self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        if self._pending:
+            self._task = asyncio.create_task(self.flush())
+            self._task.add_done_callback(self._on_flushed)
+
+    def _on_flushed(self, task: asyncio.Task) -> None:
+        if self._task is task:
+            self._task = None
+        if task.cancelled() or (exc := task.exception()) is None:
+            return
+        log("WARNING", f"Failed to flush message stream {self.message_id}", exc)
+        # 延后发送失败时没有调用方, 在下一次 write 或 close 时抛出
+        if self._error is None:
+            self._error = exc
+
+    def _raise_error(self) -> None:
+        if (exc := self._error) is not None:
+            self._error = None
+            raise exc
+
+    async def flush(self) -> None:
+        """立即发送所有未发送的文本"""
+        from nonechat.message import Text, ConsoleMessage
+
+        async with self._lock:  # type: ignore
+            if not self._pending:
+                return
+            self._text += "".join(self._pending)
+            self._pending.clear()
+            await self._edit(ConsoleMessage([*self._prefix, Text(self._lead + self._text)]))
+
+    async def close(self) -> None:
+        """发送剩余的文本, 之后消息不再更新"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self.message_id is None:
+            return
+        if (task := self._task) is not None:
+            await asyncio.wait([task])
+        self._raise_error()
+        await self.flush()
+
+    async def _edit(self, content: "ConsoleMessage") -> None:
+        await self.bot.call_api("edit_msg", message_id=self.message_id, content=content, channel_id=self.channel.id)
+        self._last_edit = asyncio.get_running_loop().time()
+        self.edits += 1
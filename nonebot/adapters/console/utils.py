@@ -1,4 +1,12 @@
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Generic, TypeVar, Optional
+
 from nonebot.utils import logger_wrapper
+from nonebot.log import logger, logger_id, default_filter
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
 
 log = logger_wrapper("Console")
 
@@ -12,3 +20,69 @@ def truncate(s: str, length: int = 70, kill_words: bool = True, end: str = "..."
 
     result = s[: length - len(end)].rsplit(maxsplit=1)[0]
     return result + end
+
+
+def log_enabled(level: str) -> bool:
+    """判断指定等级的日志是否可能被输出, 用于跳过日志内容的构造
+
+    仅有 NoneBot 默认日志处理器时会同时考虑 `log_level` 配置, 其他情况下只比较处理器的最低等级。
+    """
+    core = logger._core  # type: ignore
+    levelno = logger.level(level).no
+    if levelno < core.min_level:
+        return False
+    handlers = core.handlers
+    if len(handlers) == 1 and (handler := handlers.get(logger_id)) is not None and handler._filter is default_filter:
+        log_level = core.extra.get("nonebot_log_level", "INFO")
+        return levelno >= (logger.level(log_level).no if isinstance(log_level, str) else log_level)
+    return True
+
+
+class LRUCache(Generic[K, V]):
+    """容量有限的 LRU 缓存
+
+    `maxsize` 为 0 时不缓存任何内容。
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict[K, V] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: K) -> Optional[V]:
+        """获取缓存值, 键不可哈希时抛出 `TypeError`"""
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: K, value: V) -> None:
+        if self.maxsize <= 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def info(self) -> dict[str, int]:
+        """缓存统计信息"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+        }